@@ -10,6 +10,7 @@ Schedule: every day at 09:00 UTC.
 """
 
 import datetime as dt
+import json
 import sys
 from pathlib import Path
 
@@ -52,6 +53,12 @@ def _load_latest_parquet(**context):
     context["ti"].xcom_push(key="parquet_file", value=latest)
 
 
+# Digest requests are batch traffic: MLService serves bot requests first
+ML_HEADERS = {"X-Priority": "batch"}
+# Longest expected gap between two results of the batch stream
+ML_READ_TIMEOUT = 300.0
+
+
 def _generate_summaries(**context):
     grouped = context["ti"].xcom_pull(
         task_ids="load_latest_parquet",
@@ -61,27 +68,48 @@ def _generate_summaries(**context):
         print("No notifications to summarize")
         return
 
+    # MLService packs each list into its token budget (collapsing repeats,
+    # keeping high-priority and recent ones); it expects newest first, the
+    # archive is in arrival order
+    jobs = [
+        {
+            "id": str(tg_id),
+            "notifications": notifications[::-1],
+            "max_tokens": SUMMARY_MAX_TOKENS,
+        }
+        for tg_id, notifications in grouped.items()
+        if notifications
+    ]
+
     summaries = {}
-    for tg_id_str, notifications in grouped.items():
-        tg_id = int(tg_id_str)
-        if not notifications:
-            continue
-
-        try:
-            resp = httpx.post(
-                f"{ML_SERVICE_URL}/summarize",
-                json={
-                    "notifications": notifications[:30],
-                    "max_tokens": SUMMARY_MAX_TOKENS,
-                },
-                timeout=120.0,
-            )
+    try:
+        with httpx.stream(
+            "POST",
+            f"{ML_SERVICE_URL}/summarize/batch",
+            json={"jobs": jobs},
+            headers=ML_HEADERS,
+            timeout=httpx.Timeout(ML_READ_TIMEOUT, connect=10.0),
+        ) as resp:
             resp.raise_for_status()
-            summary = resp.json().get("summary", "")
-            summaries[tg_id] = summary
-            print(f"User {tg_id}: generated summary ({len(summary)} chars)")
-        except Exception as e:
-            print(f"User {tg_id}: ML summarization failed: {e}")
+            for line in resp.iter_lines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                if result.get("done"):
+                    print(
+                        f"Batch finished in {result['total_ms'] / 1000:.1f}s: "
+                        f"{result['succeeded']} succeeded, {result['failed']} failed"
+                    )
+                    break
+                tg_id = int(result["id"])
+                if "error" in result:
+                    print(f"User {tg_id}: ML summarization failed: {result['error']}")
+                    continue
+                summaries[tg_id] = result["summary"]
+                print(f"User {tg_id}: generated summary ({len(result['summary'])} chars)")
+    except Exception as e:
+        # Keep the summaries that already arrived
+        print(f"ML batch summarization failed after {len(summaries)} summaries: {e}")
 
     context["ti"].xcom_push(key="summaries", value=summaries)
 
@@ -0,0 +1,66 @@
+"""Shared fixtures for BotService microbenchmarks."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SERVICES = ["github", "stackoverflow"]
+NOTIF_TYPES = ["issue", "pull_request", "commit", "branch", "actions", "new_answer"]
+METHODS = [
+    ("GitHub", "ISSUE", "https://github.com/owner/repo-{i}/issues/{i}"),
+    ("GitHub", "PULL_REQUEST", "https://github.com/owner/repo-{i}/pull/{i}"),
+    ("GitHub", "COMMIT", "https://github.com/owner/repo-{i}/commit/a1b2c3d{i}"),
+    ("GitHub", "BRANCH", "https://github.com/owner/repo-{i}/tree/feature-{i}"),
+    ("StackOverflow", "NEW_ANSWER", "https://stackoverflow.com/questions/7{i:07d}"),
+]
+
+
+def make_notification(i: int) -> dict:
+    """A notification shaped like CoreService output (~300 chars of body)."""
+    service = SERVICES[i % len(SERVICES)]
+    return {
+        "telegram_id": 100000 + i % 50,
+        "title": f"Update #{i} in owner/repo-{i % 7}",
+        "message": ("Commit pushed by @dev: refactor notification pipeline. " * 6)[:300],
+        "service": service,
+        "type": NOTIF_TYPES[i % len(NOTIF_TYPES)],
+        "url": f"https://github.com/owner/repo-{i % 7}/issues/{i}",
+    }
+
+
+def make_actions(count: int) -> list[dict]:
+    """Subscriptions as returned by ``DBClient.get_actions_by_telegram_id``."""
+    actions = []
+    for i in range(count):
+        service, method, url = METHODS[i % len(METHODS)]
+        actions.append({
+            "id": i + 1,
+            "query": url.format(i=i),
+            "describe": method,
+            "service": {"id": 1, "name": service},
+            "method": {"id": 1, "name": method},
+        })
+    return actions
+
+
+@pytest.fixture(scope="session")
+def event_loop_runner():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def fake_cache(event_loop_runner):
+    """RedisCache wired to an in-process fakeredis server."""
+    fakeredis = pytest.importorskip("fakeredis")
+    from redis_cache import RedisCache
+
+    cache = RedisCache()
+    cache._redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    yield cache
+    event_loop_runner(cache.close())
@@ -0,0 +1,24 @@
+#!/usr/bin/env bash
+# Run BotService microbenchmarks and compare against the saved JSON baselines.
+#
+#   ./benchmarks/run.sh            # compare with the latest baseline
+#   ./benchmarks/run.sh --save     # record a new baseline
+#
+# Baselines are per machine (benchmarks/baselines/<machine id>/); the first
+# run on a machine without one records it instead of comparing.
+set -euo pipefail
+
+cd "$(dirname "$0")/.."
+
+STORAGE="file://benchmarks/baselines"
+ARGS=(benchmarks --benchmark-storage="$STORAGE" --benchmark-columns=min,mean,stddev,ops)
+MACHINE="$(uv run python -c 'from pytest_benchmark.utils import get_machine_id; print(get_machine_id())')"
+
+if [ "${1:-}" = "--save" ]; then
+    uv run pytest "${ARGS[@]}" --benchmark-autosave
+elif compgen -G "benchmarks/baselines/$MACHINE/*.json" > /dev/null; then
+    uv run pytest "${ARGS[@]}" --benchmark-compare --benchmark-compare-fail=mean:15%
+else
+    echo "⚠️  No baseline for $MACHINE yet — recording one"
+    uv run pytest "${ARGS[@]}" --benchmark-autosave
+fi
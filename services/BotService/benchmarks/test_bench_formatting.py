@@ -0,0 +1,24 @@
+"""Benchmarks for message formatting in main.py."""
+
+import pytest
+
+from conftest import make_actions, make_notification
+
+main = pytest.importorskip("main")
+
+
+@pytest.mark.parametrize("index", [0, 3, 5])
+def test_format_notification(benchmark, index):
+    n = make_notification(index)
+    text = benchmark(
+        main._format_notification,
+        n["service"], n["type"], n["title"], n["message"], n["url"],
+    )
+    assert n["title"] in text
+
+
+@pytest.mark.parametrize("count", [0, 5, 25, 100])
+def test_format_subscription_list(benchmark, count):
+    actions = make_actions(count)
+    text, kb = benchmark(main._format_subscription_list, actions)
+    assert len(kb.inline_keyboard) == (count + 1 if count else 2)
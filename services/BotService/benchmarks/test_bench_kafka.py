@@ -0,0 +1,57 @@
+"""Benchmarks for Kafka payload encoding and decoding.
+
+Encoded size per message and compressed size per 100-record batch are
+stored in ``extra_info`` so they end up in the JSON baselines next to the
+timings.
+"""
+
+import pytest
+
+from conftest import make_notification
+
+kafka_consumer = pytest.importorskip("kafka_consumer")
+codec = pytest.importorskip("notification_codec")
+
+ENCODINGS = [codec.ENCODING_JSON, codec.ENCODING_BINARY]
+
+
+def _encoded(payload: dict, encoding: str) -> tuple[bytes, list]:
+    raw, used = codec.encode(payload, encoding)
+    assert used == encoding
+    headers = [(codec.ENCODING_HEADER, used.encode("ascii"))]
+    return raw, headers
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("kind", ["minimal", "full"])
+def test_deserialize_notification(benchmark, kind, encoding):
+    payload = {"telegram_id": 123456789} if kind == "minimal" else make_notification(1)
+    raw, headers = _encoded(payload, encoding)
+    benchmark.extra_info["bytes"] = len(raw)
+    result = benchmark(kafka_consumer.deserialize_notification, raw, headers)
+    assert result == payload
+
+
+def test_deserialize_legacy_json_without_header(benchmark):
+    payload = make_notification(2)
+    raw, _ = codec.encode(payload, codec.ENCODING_JSON)
+    assert benchmark(kafka_consumer.deserialize_notification, raw) == payload
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_encode_notification(benchmark, encoding):
+    payload = make_notification(3)
+    raw, used = benchmark(codec.encode, payload, encoding)
+    assert used == encoding
+    benchmark.extra_info["bytes"] = len(raw)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("compression", ["lz4", "zstd"])
+def test_compressed_batch(benchmark, encoding, compression):
+    cramjam = pytest.importorskip("cramjam")
+    batch = b"".join(_encoded(make_notification(i), encoding)[0] for i in range(100))
+    compress = {"lz4": cramjam.lz4.compress_block, "zstd": cramjam.zstd.compress}[compression]
+    compressed = benchmark(lambda: bytes(compress(batch)))
+    benchmark.extra_info["raw_bytes_per_message"] = len(batch) / 100
+    benchmark.extra_info["compressed_bytes_per_message"] = len(compressed) / 100
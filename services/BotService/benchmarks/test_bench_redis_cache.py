@@ -0,0 +1,34 @@
+"""Benchmarks for RedisCache against an in-process fake Redis."""
+
+from conftest import make_actions
+
+
+def test_cache_set(benchmark, fake_cache, event_loop_runner):
+    actions = make_actions(25)
+    benchmark(lambda: event_loop_runner(fake_cache.set_subscriptions(1, actions)))
+
+
+def test_cache_get_hit(benchmark, fake_cache, event_loop_runner):
+    actions = make_actions(25)
+    event_loop_runner(fake_cache.set_subscriptions(1, actions))
+    result = benchmark(lambda: event_loop_runner(fake_cache.get_subscriptions(1)))
+    assert result == actions
+
+
+def test_cache_get_miss(benchmark, fake_cache, event_loop_runner):
+    result = benchmark(lambda: event_loop_runner(fake_cache.get_subscriptions(2)))
+    assert result is None
+
+
+def test_push_notification(benchmark, fake_cache, event_loop_runner):
+    text = "[github/commit] Update in owner/repo: " + "x" * 300
+    benchmark(lambda: event_loop_runner(fake_cache.push_notification(1, text)))
+
+
+def test_get_notification_history(benchmark, fake_cache, event_loop_runner):
+    for i in range(50):
+        event_loop_runner(fake_cache.push_notification(1, f"notification {i}"))
+    items = benchmark(
+        lambda: event_loop_runner(fake_cache.get_notification_history(1, limit=20))
+    )
+    assert len(items) == 20
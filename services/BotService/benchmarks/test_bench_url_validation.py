@@ -0,0 +1,26 @@
+"""Benchmarks for subscription URL validation against URL_PATTERNS."""
+
+import pytest
+
+main = pytest.importorskip("main")
+
+LINKS = {
+    "issue": "https://github.com/owner/repo/issues/123",
+    "pull_request": "https://github.com/owner/repo/pull/42",
+    "commit": "https://github.com/owner/repo/commit/abc1234def",
+    "actions": "https://github.com/owner/repo/actions/workflows/ci.yml",
+    "branch": "https://github.com/owner/repo/tree/feature/long-branch-name",
+    "so_new_answer": "https://stackoverflow.com/questions/12345678",
+}
+
+
+@pytest.mark.parametrize("sub_type", sorted(LINKS))
+def test_url_pattern_match(benchmark, sub_type):
+    pattern = main.URL_PATTERNS[sub_type]
+    assert benchmark(pattern.search, LINKS[sub_type])
+
+
+def test_url_pattern_reject(benchmark):
+    pattern = main.URL_PATTERNS["issue"]
+    link = "https://gitlab.com/" + "owner/" * 40 + "repo/-/issues/1"
+    assert benchmark(pattern.search, link) is None
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import Any, Optional
 
@@ -7,22 +8,70 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DB_API_URL = os.getenv("DB_API_URL", "http://localhost:8080/api")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
 
 
 class DBClient:
     """HTTP client for database API"""
 
-    def __init__(self, base_url: str = DB_API_URL):
+    def __init__(self, base_url: str = DB_API_URL, pool_size: int = DB_POOL_SIZE):
         self.base_url = base_url if base_url.endswith("/") else f"{base_url}/"
+        self.pool_size = pool_size
         self.client: Optional[httpx.AsyncClient] = None
+        self._persistent = False
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=self.pool_size * 2,
+                max_keepalive_connections=self.pool_size,
+            ),
+        )
 
     async def __aenter__(self):
-        self.client = httpx.AsyncClient(base_url=self.base_url, timeout=30.0)
+        # A long-lived client opened by connect() is shared, not recreated
+        if not self._persistent:
+            self.client = self._new_client()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.client and not self._persistent:
+            await self.client.aclose()
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def connect(self) -> None:
+        """Open a long-lived pooled client reused by every ``async with db``"""
+        if self._persistent:
+            return
+        self.client = self._new_client()
+        self._persistent = True
+
+    async def close(self) -> None:
         if self.client:
             await self.client.aclose()
+        self.client = None
+        self._persistent = False
+
+    async def health(self) -> bool:
+        """Cheap reachability probe against DBService"""
+        response = await self.client.get("services")
+        return response.status_code < 500
+
+    async def warm_up(self, connections: Optional[int] = None) -> None:
+        """Probe DBService and pre-fill the keep-alive pool.
+
+        Issues ``connections`` concurrent probes so that many sockets are
+        already open when the first user clicks arrive.
+        """
+        await self.connect()
+        if not await self.health():
+            raise RuntimeError("DBService health probe failed")
+        extra = (connections or self.pool_size) - 1
+        if extra > 0:
+            await asyncio.gather(*(self.health() for _ in range(extra)))
 
     # ── User management ──────────────────────────────────────────────────────
 
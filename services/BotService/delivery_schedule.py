@@ -0,0 +1,220 @@
+"""Per-user delivery policies and the scheduler for batched delivery.
+
+A policy is stored in Redis as ``{"interval": minutes, "quiet": [start, end],
+"utc_offset": hours}``. ``interval == 0`` means instant delivery; quiet hours
+(local time, end exclusive) defer even instant notifications until they end.
+
+Deferred notifications are appended to a per-user list, and the user is put
+into one sorted set scored by flush time. The scheduler only reads the due
+head of that set, so the cost does not depend on how many users are pending.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+
+from redis_cache import RedisCache
+
+load_dotenv()
+
+SCHEDULER_TICK = float(os.getenv("SCHEDULER_TICK", "5"))
+SCHEDULER_BATCH = int(os.getenv("SCHEDULER_BATCH", "200"))
+DEFAULT_UTC_OFFSET = int(os.getenv("DEFAULT_UTC_OFFSET", "3"))
+
+# Quiet hours offered in the bot menu (local time, end exclusive)
+QUIET_HOURS = (23, 8)
+
+# Types that are always delivered instantly, whatever the policy says
+INSTANT_TYPES = {"auth", "error"}
+
+# Telegram rejects messages longer than 4096 characters
+MAX_MESSAGE_LENGTH = 4000
+
+# Tags, entities and plain text runs of Telegram HTML
+_HTML_TOKEN = re.compile(r"<[^>]*>|&#?\w+;|[^<&]+|[<&]")
+_TAG_NAME = re.compile(r"</?\s*([\w-]+)")
+
+INSTANT_POLICY = {"interval": 0, "quiet": None, "utc_offset": DEFAULT_UTC_OFFSET}
+
+logger = logging.getLogger(__name__)
+
+
+def _in_quiet_hours(policy: dict, ts: float) -> bool:
+    quiet = policy.get("quiet")
+    if not quiet:
+        return False
+    start, end = quiet
+    hour = time.gmtime(ts + policy.get("utc_offset", DEFAULT_UTC_OFFSET) * 3600).tm_hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def _quiet_end(policy: dict, ts: float) -> float:
+    """First moment at or after ``ts`` that is outside quiet hours"""
+    offset = policy.get("utc_offset", DEFAULT_UTC_OFFSET) * 3600
+    # Step to the next full local hour until the window is left (at most 24)
+    ts = math.floor((ts + offset) / 3600) * 3600 - offset
+    for _ in range(25):
+        if not _in_quiet_hours(policy, ts):
+            return ts
+        ts += 3600
+    return ts
+
+
+def next_flush(policy: dict, now: float) -> Optional[float]:
+    """When a notification arriving at ``now`` should be sent, None = instantly"""
+    interval = policy.get("interval", 0) * 60
+    if interval:
+        # Align to wall-clock boundaries (:00, :15, …) so batches line up
+        due = math.ceil(now / interval) * interval
+    elif _in_quiet_hours(policy, now):
+        due = now
+    else:
+        return None
+    if _in_quiet_hours(policy, due):
+        due = _quiet_end(policy, due)
+    return due
+
+
+def _truncate_html(text: str, limit: int) -> str:
+    """Cut Telegram HTML to ``limit`` characters outside tags and entities.
+
+    Tags still open at the cut are closed, so Telegram accepts the message.
+    """
+    if len(text) <= limit:
+        return text
+    out: list[str] = []
+    open_tags: list[str] = []
+    # Room kept for the ellipsis and the closing tags
+    reserved = 1
+    length = 0
+    for match in _HTML_TOKEN.finditer(text):
+        token = match.group()
+        tag = _TAG_NAME.match(token) if token.startswith("<") and token.endswith(">") else None
+        if tag and token.startswith("</"):
+            # Its room is already reserved
+            if tag.group(1) in open_tags:
+                while open_tags.pop() != tag.group(1):
+                    pass
+                reserved -= len(tag.group(1)) + 3
+        elif tag and not token.endswith("/>"):
+            closing = len(tag.group(1)) + 3
+            if length + len(token) + reserved + closing > limit:
+                break
+            open_tags.append(tag.group(1))
+            reserved += closing
+        elif length + len(token) + reserved > limit:
+            if not token.startswith("&"):
+                out.append(token[:limit - length - reserved])
+            break
+        out.append(token)
+        length += len(token)
+    return "".join(out) + "…" + "".join(f"</{name}>" for name in reversed(open_tags))
+
+
+def combine_notifications(items: list[str]) -> list[tuple[str, list[str]]]:
+    """Join deferred notifications into as few Telegram messages as possible.
+
+    Returns ``(message, items in it)`` pairs, so undelivered items can be
+    deferred again.
+    """
+    header = f"🗂 <b>Уведомления за период ({len(items)})</b>\n\n"
+    messages: list[tuple[str, list[str]]] = []
+    current, included = header, []
+    for item in items:
+        block = _truncate_html(item, MAX_MESSAGE_LENGTH) + "\n\n"
+        if len(current) + len(block) > MAX_MESSAGE_LENGTH and current != header:
+            messages.append((current.rstrip(), included))
+            current, included = "", []
+        current += block
+        included.append(item)
+    if included:
+        messages.append((current.rstrip(), included))
+    return messages
+
+
+class DeliveryScheduler:
+    """Flushes due users' deferred notifications as combined messages"""
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        tick: float = SCHEDULER_TICK,
+        batch: int = SCHEDULER_BATCH,
+    ):
+        self.cache = cache
+        self.tick = tick
+        self.batch = batch
+        self._stopping = asyncio.Event()
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    async def policy(self, telegram_id: int) -> dict:
+        return await self.cache.get_delivery_policy(telegram_id) or INSTANT_POLICY
+
+    async def defer(self, telegram_id: int, notif_type: str, text: str) -> bool:
+        """Store ``text`` for later if the user's policy asks for it.
+
+        Returns True when deferred, False when it must be sent right away.
+        """
+        if notif_type in INSTANT_TYPES:
+            return False
+        policy = await self.policy(telegram_id)
+        due = next_flush(policy, time.time())
+        if due is None:
+            return False
+        return await self.cache.defer_notification(telegram_id, text, due)
+
+    async def run(self, send: Callable[[int, str], Awaitable]) -> None:
+        """Flush loop: ``send(telegram_id, text)`` delivers one message"""
+        self._stopping.clear()
+        self._finished.clear()
+        logger.info(f"Delivery scheduler started (tick {self.tick}s, batch {self.batch})")
+        try:
+            while not self._stopping.is_set():
+                users = await self.cache.due_deferred_users(time.time(), self.batch)
+                if users:
+                    await asyncio.gather(*(self._flush(u, send) for u in users))
+                if len(users) < self.batch:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.tick)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._finished.set()
+
+    def stop(self) -> None:
+        """Finish the flushes in progress, then leave the loop"""
+        self._stopping.set()
+
+    async def wait_stopped(self) -> None:
+        await self._finished.wait()
+
+    async def _flush(self, telegram_id: int, send: Callable[[int, str], Awaitable]) -> None:
+        items = await self.cache.claim_deferred(telegram_id)
+        if not items:
+            return
+        messages = combine_notifications(items)
+        for i, (text, _) in enumerate(messages):
+            try:
+                await send(telegram_id, text)
+            except Exception as e:
+                # Put back everything not delivered yet for the next slot
+                undelivered = [item for _, included in messages[i:] for item in included]
+                logger.warning(
+                    f"Batched delivery to {telegram_id} failed, "
+                    f"{len(undelivered)} notifications deferred again: {e}"
+                )
+                policy = await self.policy(telegram_id)
+                due = next_flush(policy, time.time() + 60) or time.time() + 60
+                for item in undelivered:
+                    await self.cache.defer_notification(telegram_id, item, due)
+                return
+        logger.info(f"Flushed {len(items)} deferred notifications to {telegram_id}")
@@ -0,0 +1,280 @@
+"""Priority lanes and rate-limited scheduling of Telegram deliveries.
+
+Every notification is put into a lane derived from its ``type``. Sender
+workers share one Telegram send budget (token bucket) and pick the next
+delivery by smooth weighted round-robin across non-empty lanes. A lane
+whose head has waited longer than ``max_wait`` is served first, so bulk
+lanes are slowed down but never starved.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import statistics
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TELEGRAM_SEND_RATE = float(os.getenv("TELEGRAM_SEND_RATE", "25"))
+SEND_CONCURRENCY = int(os.getenv("SEND_CONCURRENCY", "8"))
+LANE_MAX_WAIT = float(os.getenv("LANE_MAX_WAIT", "30"))
+LANE_METRICS_INTERVAL = float(os.getenv("LANE_METRICS_INTERVAL", "60"))
+
+LANE_HIGH = "high"
+LANE_NORMAL = "normal"
+LANE_LOW = "low"
+
+LANE_WEIGHTS = {
+    LANE_HIGH: 6,
+    LANE_NORMAL: 3,
+    LANE_LOW: 1,
+}
+
+# Notification type → lane; unknown types go to the normal lane
+PRIORITY_BY_TYPE = {
+    "auth": LANE_HIGH,
+    "error": LANE_HIGH,
+    "pull_request": LANE_NORMAL,
+    "issue": LANE_NORMAL,
+    "new_answer": LANE_NORMAL,
+    "new_comment": LANE_NORMAL,
+    "commit": LANE_LOW,
+    "actions": LANE_LOW,
+    "branch": LANE_LOW,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def lane_for(notif_type: str) -> str:
+    return PRIORITY_BY_TYPE.get(notif_type, LANE_NORMAL)
+
+
+class _Delivery:
+    __slots__ = ("lane", "send", "future", "enqueued_at", "context")
+
+    def __init__(self, lane: str, send: Callable[[], Awaitable], future: asyncio.Future):
+        self.lane = lane
+        self.send = send
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        # Keeps the caller's trace span as parent of the send
+        self.context = contextvars.copy_context()
+
+
+class _TokenBucket:
+    """Global send budget shared by all sender workers"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Stop spending budget, e.g. after Telegram answered RetryAfter"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LaneStats:
+    """Delivery latency of one lane (enqueue → sent), over a recent window"""
+
+    def __init__(self, window: int = 1024):
+        self.sent = 0
+        self.failed = 0
+        self.max_wait = 0.0
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def observe(self, wait: float, latency: float, ok: bool) -> None:
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.max_wait = max(self.max_wait, wait)
+        self._latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self._latencies)
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=20)
+            p50, p95 = cuts[9], cuts[18]
+        else:
+            p50 = p95 = latencies[0] if latencies else 0.0
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "p50_ms": round(p50 * 1000, 1),
+            "p95_ms": round(p95 * 1000, 1),
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class DeliveryDispatcher:
+    """Schedules Telegram sends from priority lanes into a shared budget"""
+
+    def __init__(
+        self,
+        rate: float = TELEGRAM_SEND_RATE,
+        concurrency: int = SEND_CONCURRENCY,
+        weights: Optional[dict[str, int]] = None,
+        max_wait: float = LANE_MAX_WAIT,
+    ):
+        self.weights = weights or LANE_WEIGHTS
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self._bucket = _TokenBucket(rate)
+        self._lanes: dict[str, deque[_Delivery]] = {lane: deque() for lane in self.weights}
+        self._credit = {lane: 0 for lane in self.weights}
+        self._stats = {lane: LaneStats() for lane in self.weights}
+        self._available = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    async def deliver(self, notif_type: str, send: Callable[[], Awaitable]) -> None:
+        """Queue ``send`` in the lane for ``notif_type`` and wait until it ran.
+
+        Exceptions raised by ``send`` are re-raised to the caller.
+        """
+        lane = lane_for(notif_type)
+        item = _Delivery(lane, send, asyncio.get_running_loop().create_future())
+        self._lanes[lane].append(item)
+        self._available.set()
+        await item.future
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"sender-{i}")
+            for i in range(self.concurrency)
+        ]
+        if LANE_METRICS_INTERVAL > 0:
+            self._tasks.append(asyncio.create_task(self._log_metrics()))
+        logger.info(
+            f"Delivery dispatcher started: {self.concurrency} senders, "
+            f"{self._bucket.rate:.0f} msg/s, weights {self.weights}"
+        )
+
+    async def stop(self) -> None:
+        """Stop senders; deliveries still queued are cancelled"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self._lanes.values():
+            while queue:
+                queue.popleft().future.cancel()
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            lane: {"queued": len(self._lanes[lane]), **self._stats[lane].snapshot()}
+            for lane in self.weights
+        }
+
+    # ── Scheduling ───────────────────────────────────────────────────────────
+
+    def _pick_lane(self) -> Optional[str]:
+        ready = [lane for lane, queue in self._lanes.items() if queue]
+        if not ready:
+            return None
+
+        # Starvation protection: serve the oldest overdue head first
+        now = time.monotonic()
+        overdue = [
+            lane for lane in ready
+            if now - self._lanes[lane][0].enqueued_at > self.max_wait
+        ]
+        if overdue:
+            return min(overdue, key=lambda lane: self._lanes[lane][0].enqueued_at)
+
+        # Smooth weighted round-robin over non-empty lanes
+        total = 0
+        for lane in ready:
+            self._credit[lane] += self.weights[lane]
+            total += self.weights[lane]
+        best = max(ready, key=lambda lane: self._credit[lane])
+        self._credit[best] -= total
+        return best
+
+    def _pop(self) -> Optional[_Delivery]:
+        while True:
+            lane = self._pick_lane()
+            if lane is None:
+                self._available.clear()
+                return None
+            item = self._lanes[lane].popleft()
+            # The consumer may have given up on it (shutdown deadline)
+            if not item.future.done():
+                return item
+
+    async def _worker(self) -> None:
+        while True:
+            await self._available.wait()
+            item = self._pop()
+            if item is None:
+                continue
+            # Budget is spent only on an actual send
+            try:
+                await self._bucket.acquire()
+            except asyncio.CancelledError:
+                item.future.cancel()
+                raise
+
+            started = time.monotonic()
+            try:
+                await asyncio.create_task(item.send(), context=item.context)
+            except asyncio.CancelledError:
+                item.future.cancel()
+                raise
+            except Exception as e:
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None:
+                    # Flood control: pause the whole budget and retry first
+                    logger.warning(f"Telegram flood control, pausing sends for {retry_after}s")
+                    self._bucket.pause(float(retry_after))
+                    self._lanes[item.lane].appendleft(item)
+                    self._available.set()
+                    continue
+                if not item.future.done():
+                    item.future.set_exception(e)
+                ok = False
+            else:
+                if not item.future.done():
+                    item.future.set_result(None)
+                ok = True
+            finished = time.monotonic()
+            self._stats[item.lane].observe(
+                wait=started - item.enqueued_at,
+                latency=finished - item.enqueued_at,
+                ok=ok,
+            )
+
+    async def _log_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(LANE_METRICS_INTERVAL)
+            for lane, snapshot in self.stats().items():
+                logger.info(f"Lane {lane}: {snapshot}")
@@ -1,21 +1,61 @@
 import asyncio
-import json
 import logging
 import os
-from typing import Callable
+from typing import Awaitable, Callable, Optional
 
-from aiokafka import AIOKafkaConsumer
 from dotenv import load_dotenv
 
+import notification_codec
+from tracing import extract_context, set_attributes, span
+
 load_dotenv()
 
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
 KAFKA_TOPIC = "Notifications"
 KAFKA_GROUP_ID = os.getenv("KAFKA_GROUP_ID", "bot-service-group")
+KAFKA_MAX_IN_FLIGHT = int(os.getenv("KAFKA_MAX_IN_FLIGHT", "200"))
+FETCH_TIMEOUT_MS = 1000
 
 logger = logging.getLogger(__name__)
 
 
+def deserialize_notification(raw: bytes, headers=None) -> dict:
+    """Decode a raw Kafka record value into a notification dict"""
+    return notification_codec.decode(raw, headers)
+
+
+class _OffsetTracker:
+    """Tracks which offsets are safe to commit when records finish out of order.
+
+    For every partition the committable offset is the lowest offset still in
+    flight, or one past the highest finished offset when nothing is in flight.
+    """
+
+    def __init__(self):
+        self._in_flight: dict = {}
+        self._finished: dict = {}
+        self._committed: dict = {}
+
+    def begin(self, tp, offset: int) -> None:
+        self._in_flight.setdefault(tp, set()).add(offset)
+
+    def finish(self, tp, offset: int) -> None:
+        self._in_flight[tp].discard(offset)
+        self._finished[tp] = max(self._finished.get(tp, 0), offset + 1)
+
+    def committable(self) -> dict:
+        offsets = {}
+        for tp, finished in self._finished.items():
+            in_flight = self._in_flight.get(tp)
+            offset = min(in_flight) if in_flight else finished
+            if offset > self._committed.get(tp, -1):
+                offsets[tp] = offset
+        return offsets
+
+    def committed(self, offsets: dict) -> None:
+        self._committed.update(offsets)
+
+
 class NotificationConsumer:
     """Kafka consumer for Notifications topic"""
 
@@ -24,44 +64,185 @@ class NotificationConsumer:
         bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
         topic: str = KAFKA_TOPIC,
         group_id: str = KAFKA_GROUP_ID,
+        max_in_flight: int = KAFKA_MAX_IN_FLIGHT,
     ):
         self.bootstrap_servers = bootstrap_servers
         self.topic = topic
         self.group_id = group_id
+        self.max_in_flight = max_in_flight
         self.consumer = None
         self.running = False
+        self._offsets = _OffsetTracker()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight: set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._done = asyncio.Event()
+        # telegram_id → finishes when that user's latest record is handled
+        self._tails: dict[object, asyncio.Future] = {}
 
-    async def start(self, message_handler: Callable) -> None:
-        """Start consuming messages from Kafka"""
-        self.consumer = AIOKafkaConsumer(
+    async def connect(self) -> None:
+        """Connect to the brokers and join the consumer group"""
+        if self.consumer is not None:
+            return
+        # aiokafka is heavy to import, load it only when actually connecting
+        from aiokafka import AIOKafkaConsumer
+
+        consumer = AIOKafkaConsumer(
             self.topic,
             bootstrap_servers=self.bootstrap_servers,
             group_id=self.group_id,
             auto_offset_reset="latest",  # Start from latest messages
-            enable_auto_commit=True,
-            value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+            enable_auto_commit=False,
         )
+        try:
+            await consumer.start()
+        except BaseException:
+            await consumer.stop()
+            raise
+        self.consumer = consumer
+        logger.info(f"Kafka consumer connected to {self.bootstrap_servers}")
+
+    async def start(self, message_handler: Callable) -> None:
+        """Start consuming messages from Kafka.
 
-        await self.consumer.start()
+        Up to ``max_in_flight`` records are handled concurrently, but
+        records of one ``telegram_id`` one after another in offset order,
+        so each user gets notifications in order. Offsets are committed
+        manually and only up to the first unfinished record, so a shutdown
+        never skips a delivery.
+        """
+        await self.connect()
         self.running = True
+        self._task = asyncio.current_task()
+        self._done.clear()
         logger.info(f"Kafka consumer started. Listening to topic: {self.topic}")
 
         try:
-            async for message in self.consumer:
-                if not self.running:
-                    break
-                
-                try:
-                    logger.info(f"Received message from Kafka: {message.value}")
-                    await message_handler(message.value)
-                except Exception as e:
-                    logger.error(f"Error processing message: {e}", exc_info=True)
+            while self.running:
+                with span("kafka.fetch", topic=self.topic):
+                    batches = await self.consumer.getmany(
+                        timeout_ms=FETCH_TIMEOUT_MS,
+                        max_records=self.max_in_flight,
+                    )
+                for tp, messages in batches.items():
+                    for message in messages:
+                        if not self.running:
+                            break
+                        await self._slots.acquire()
+                        self._offsets.begin(tp, message.offset)
+                        task = asyncio.create_task(self._run(tp, message, message_handler))
+                        self._in_flight.add(task)
+                        task.add_done_callback(self._in_flight.discard)
+                await self.commit()
+        finally:
+            self._done.set()
+
+    async def _run(self, tp, message, message_handler: Callable) -> None:
+        try:
+            await self._process(message, message_handler)
+        except asyncio.CancelledError:
+            # Left uncommitted on purpose: it is redelivered after restart
+            raise
+        else:
+            self._offsets.finish(tp, message.offset)
+        finally:
+            self._slots.release()
+
+    async def _process(self, message, message_handler: Callable) -> None:
+        with span(
+            "notification.deliver",
+            context=extract_context(message.headers),
+            **{
+                "messaging.kafka.partition": message.partition,
+                "messaging.kafka.offset": message.offset,
+            },
+        ):
+            try:
+                with span("kafka.decode", bytes=len(message.value or b"")):
+                    value = deserialize_notification(message.value, message.headers)
+                telegram_id = None
+                if isinstance(value, dict):
+                    telegram_id = value.get("telegram_id") or value.get("chatId")
+                    set_attributes(telegram_id=telegram_id)
+                logger.info(f"Received message from Kafka: {value}")
+                await self._in_order(telegram_id, lambda: message_handler(value))
+            except Exception as e:
+                logger.error(f"Error processing message: {e}", exc_info=True)
+
+    async def _in_order(self, key, handle: Callable[[], Awaitable]) -> None:
+        """Run ``handle()`` after the previous record with the same ``key``.
+
+        Records are queued here in offset order: tasks start in creation
+        order and nothing before this call awaits.
+        """
+        if key is None:
+            await handle()
+            return
+        previous = self._tails.get(key)
+        done = asyncio.get_running_loop().create_future()
+        self._tails[key] = done
+
+        def release(_=None) -> None:
+            done.set_result(None)
+            if self._tails.get(key) is done:
+                del self._tails[key]
+
+        try:
+            if previous is not None:
+                # Shielded: a cancelled record must not cancel its predecessor
+                await asyncio.shield(previous)
+            await handle()
         finally:
-            await self.stop()
+            if previous is not None and not previous.done():
+                # Cancelled while waiting: the next record still waits for ours
+                previous.add_done_callback(release)
+            else:
+                release()
+
+    def stop_fetching(self) -> None:
+        """Stop fetching; records already in flight keep running"""
+        self.running = False
+
+    async def drain(self, timeout: float) -> None:
+        """Wait for in-flight records; cancel them after ``timeout``"""
+        if self._task is None:
+            return
+
+        async def idle() -> None:
+            await self._done.wait()
+            if self._in_flight:
+                await asyncio.wait(set(self._in_flight))
+
+        try:
+            await asyncio.wait_for(idle(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Kafka consumer did not drain in {timeout:.1f}s, "
+                f"cancelling {len(self._in_flight)} in-flight records"
+            )
+            pending = [self._task, *self._in_flight]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def commit(self) -> None:
+        """Commit offsets of every record that has been fully handled"""
+        if not self.consumer:
+            return
+        offsets = self._offsets.committable()
+        if not offsets:
+            return
+        try:
+            await self.consumer.commit(offsets)
+            self._offsets.committed(offsets)
+        except Exception as e:
+            logger.error(f"Kafka offset commit failed: {e}")
 
     async def stop(self) -> None:
         """Stop the consumer"""
         self.running = False
         if self.consumer:
+            await self.commit()
             await self.consumer.stop()
+            self.consumer = None
             logger.info("Kafka consumer stopped")
@@ -1,30 +1,80 @@
 """
-Example Kafka producer for sending notifications to the Notifications topic.
-This can be used by other services to send notifications to users via Telegram bot.
+Async Kafka producer for sending notifications to the Notifications topic.
+This can be used by other services to send notifications to users via Telegram bot,
+and doubles as a load generator for BotService:
+
+    python kafka_producer_example.py --rate 500 --duration 30 --users 1000
+    python kafka_producer_example.py --mix commit=6,issue=2,pull_request=1,auth=1
 """
-import json
+import argparse
+import asyncio
+import logging
 import os
-from typing import Optional
+import random
+import time
+from typing import Callable, Optional
 
-from kafka import KafkaProducer
 from dotenv import load_dotenv
 
+from notification_codec import ENCODING_BINARY, ENCODING_HEADER, ENCODING_JSON, encode
+
 load_dotenv()
 
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+KAFKA_TOPIC = "Notifications"
+
+logger = logging.getLogger(__name__)
 
 
 class NotificationProducer:
-    """Kafka producer for sending notifications"""
+    """Async batched Kafka producer for sending notifications.
 
-    def __init__(self, bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS):
-        self.producer = KafkaProducer(
-            bootstrap_servers=bootstrap_servers.split(","),
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+    Records are keyed by ``telegram_id`` so that all notifications of one
+    user land in the same partition and keep their order.
+    """
+
+    def __init__(
+        self,
+        bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
+        linger_ms: int = 5,
+        max_batch_size: int = 64 * 1024,
+        compression_type: Optional[str] = "lz4",
+        encoding: str = ENCODING_JSON,
+        on_delivery: Optional[Callable] = None,
+    ):
+        self.bootstrap_servers = bootstrap_servers
+        self.linger_ms = linger_ms
+        self.max_batch_size = max_batch_size
+        self.compression_type = compression_type
+        self.encoding = encoding
+        self.on_delivery = on_delivery
+        self.topic = KAFKA_TOPIC
+        self.producer = None
+        self.sent = 0
+        self.acked = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        from aiokafka import AIOKafkaProducer
+
+        self.producer = AIOKafkaProducer(
+            bootstrap_servers=self.bootstrap_servers,
+            key_serializer=lambda k: str(k).encode("utf-8"),
+            linger_ms=self.linger_ms,
+            max_batch_size=self.max_batch_size,
+            compression_type=self.compression_type,
+            acks=1,
         )
-        self.topic = "Notifications"
+        await self.producer.start()
 
-    def send_notification(
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def send_notification(
         self,
         telegram_id: int,
         title: str,
@@ -32,17 +82,20 @@ class NotificationProducer:
         service: Optional[str] = None,
         notification_type: Optional[str] = None,
         url: Optional[str] = None,
-    ) -> None:
+    ) -> asyncio.Future:
         """
-        Send notification to Kafka topic
+        Queue notification for the Kafka topic without waiting for the broker
 
         Args:
-            telegram_id: Telegram user ID
+            telegram_id: Telegram user ID (also the message key)
             title: Notification title
             message: Notification message text
             service: Service name (e.g., 'github', 'stackoverflow')
             notification_type: Type of notification (e.g., 'issue', 'pull_request')
             url: URL to the resource
+
+        Returns:
+            Future resolved with the record metadata once the broker acks it
         """
         notification_data = {
             "telegram_id": telegram_id,
@@ -58,48 +111,137 @@ class NotificationProducer:
         if url:
             notification_data["url"] = url
 
-        self.producer.send(self.topic, notification_data)
-        print(f"Notification sent to Kafka: {notification_data}")
-
-    def flush(self):
+        return await self.send(notification_data)
+
+    async def send(self, notification_data: dict) -> asyncio.Future:
+        """Append a ready notification dict to the current batch"""
+        started = time.perf_counter()
+        value, encoding = encode(notification_data, self.encoding)
+        future = await self.producer.send(
+            self.topic,
+            value,
+            key=notification_data["telegram_id"],
+            headers=[(ENCODING_HEADER, encoding.encode("ascii"))],
+        )
+        self.sent += 1
+        future.add_done_callback(lambda f: self._delivered(f, notification_data, started))
+        logger.debug(f"Notification queued for Kafka: {notification_data}")
+        return future
+
+    def _delivered(self, future: asyncio.Future, notification_data: dict, started: float) -> None:
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error:
+            self.failed += 1
+            logger.warning(f"Delivery to Kafka failed: {error}")
+        else:
+            self.acked += 1
+        if self.on_delivery:
+            self.on_delivery(notification_data, error, time.perf_counter() - started)
+
+    async def flush(self) -> None:
         """Flush pending messages"""
-        self.producer.flush()
+        await self.producer.flush()
 
-    def close(self):
+    async def close(self) -> None:
         """Close the producer"""
-        self.producer.close()
-
-
-# Example usage
-if __name__ == "__main__":
-    producer = NotificationProducer()
-
-    # Example 1: Simple notification
-    producer.send_notification(
-        telegram_id=123456789,
-        title="Test Notification",
-        message="This is a test message",
+        if self.producer:
+            await self.producer.stop()
+            self.producer = None
+
+
+# ── Load generator ───────────────────────────────────────────────────────────
+
+DEFAULT_MIX = "commit=5,branch=1,actions=1,issue=2,pull_request=2,auth=0.2,error=0.1"
+
+SAMPLE_SERVICE = {
+    "new_answer": "stackoverflow",
+    "new_comment": "stackoverflow",
+}
+
+
+def parse_mix(mix: str) -> tuple[list[str], list[float]]:
+    """Parse ``type=weight,...`` into choices and weights"""
+    types, weights = [], []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        types.append(name.strip())
+        weights.append(float(weight or 1))
+    return types, weights
+
+
+def synthetic_notification(i: int, users: int, types: list[str], weights: list[float]) -> dict:
+    notif_type = random.choices(types, weights)[0]
+    repo = f"owner/repo-{random.randint(1, 20)}"
+    return {
+        "telegram_id": 100000 + random.randrange(users),
+        "title": f"[{repo}] {notif_type} #{i}",
+        "message": f"Synthetic {notif_type} event #{i} for load testing " + "x" * random.randint(20, 280),
+        "service": SAMPLE_SERVICE.get(notif_type, "github"),
+        "type": notif_type,
+        "url": f"https://github.com/{repo}/issues/{i}",
+    }
+
+
+async def run_load(args: argparse.Namespace) -> None:
+    types, weights = parse_mix(args.mix)
+    latencies: list[float] = []
+
+    def on_delivery(_data: dict, error: Optional[BaseException], latency: float) -> None:
+        if error is None:
+            latencies.append(latency)
+
+    producer = NotificationProducer(
+        bootstrap_servers=args.bootstrap_servers,
+        linger_ms=args.linger_ms,
+        max_batch_size=args.batch_size,
+        compression_type=None if args.compression == "none" else args.compression,
+        encoding=args.encoding,
+        on_delivery=on_delivery,
     )
+    total = args.count or int(args.rate * args.duration)
+    print(f"Sending {total} notifications at {args.rate:.0f} msg/s to {args.users} users …")
+
+    async with producer:
+        started = time.perf_counter()
+        for i in range(total):
+            # Pace against the schedule so short stalls are caught up
+            delay = started + i / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await producer.send(synthetic_notification(i, args.users, types, weights))
+        await producer.flush()
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    print(f"\n{'=' * 50}")
+    print(f"  Sent:        {producer.sent}")
+    print(f"  Acked:       {producer.acked}")
+    print(f"  Failed:      {producer.failed}")
+    print(f"  Elapsed:     {elapsed:.2f} s")
+    print(f"  Throughput:  {producer.acked / elapsed:.0f} msg/s (target {args.rate:.0f})")
+    print(f"  Ack latency: p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+    print(f"{'=' * 50}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Notifications topic producer / load generator")
+    parser.add_argument("--bootstrap-servers", default=KAFKA_BOOTSTRAP_SERVERS)
+    parser.add_argument("--rate", type=float, default=100.0, help="target messages per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--count", type=int, default=0, help="total messages (overrides --duration)")
+    parser.add_argument("--users", type=int, default=100, help="number of distinct telegram ids")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="notification type weights, type=weight,...")
+    parser.add_argument("--linger-ms", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64 * 1024, help="max batch size in bytes")
+    parser.add_argument("--compression", default="lz4", choices=["none", "gzip", "snappy", "lz4", "zstd"])
+    parser.add_argument("--encoding", default=ENCODING_JSON, choices=[ENCODING_JSON, ENCODING_BINARY])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run_load(args))
 
-    # Example 2: GitHub issue notification
-    producer.send_notification(
-        telegram_id=123456789,
-        title="New Issue Created",
-        message="Issue #42: Bug in login form",
-        service="github",
-        notification_type="issue",
-        url="https://github.com/user/repo/issues/42",
-    )
-
-    # Example 3: GitHub PR notification
-    producer.send_notification(
-        telegram_id=123456789,
-        title="Pull Request Merged",
-        message="PR #15: Add new feature - merged by @user",
-        service="github",
-        notification_type="pull_request",
-        url="https://github.com/user/repo/pull/15",
-    )
 
-    producer.flush()
-    producer.close()
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import asyncio
+import html
 import logging
 import os
 import re
@@ -18,8 +19,14 @@ from aiogram.types import (
 from dotenv import load_dotenv
 
 from db_client import DBClient
+from delivery_schedule import DEFAULT_UTC_OFFSET, QUIET_HOURS, DeliveryScheduler
+from dispatcher import DeliveryDispatcher
 from kafka_consumer import NotificationConsumer
+from ml_client import MLClient, summary_cache_key
 from redis_cache import RedisCache
+from shutdown import SHUTDOWN_DRAIN_TIMEOUT, ShutdownCoordinator
+from startup import warm_up
+from tracing import setup_tracing, shutdown_tracing, span
 
 
 async def _safe_answer(callback: CallbackQuery) -> None:
@@ -32,13 +39,27 @@ async def _safe_answer(callback: CallbackQuery) -> None:
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN", "")
-
-bot = Bot(token=BOT_TOKEN)
+KAFKA_STARTUP_TIMEOUT = float(os.getenv("KAFKA_STARTUP_TIMEOUT", "20"))
+# "pipeline" (DBService → Kafka → CoreService → MLService) or "direct" (MLService via MLClient)
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "pipeline")
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "100"))
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", str(60 * 60 * 24)))
+# Notifications per summary; the whole stored history (MLService chunks long lists)
+SUMMARY_HISTORY_LIMIT = int(os.getenv("SUMMARY_HISTORY_LIMIT", "50"))
+# Direct mode: stream tokens from MLService and edit the message as they arrive
+SUMMARY_STREAMING = os.getenv("SUMMARY_STREAMING", "true").lower() in ("1", "true", "yes")
+SUMMARY_EDIT_INTERVAL = 1.0
+
+# Created in main() so that importing this module stays cheap
+bot: Bot | None = None
 dp = Dispatcher()
 router = Router()
 db = DBClient()
+ml = MLClient()
 kafka_consumer = NotificationConsumer()
+dispatcher = DeliveryDispatcher()
 cache = RedisCache()
+scheduler = DeliveryScheduler(cache)
 
 
 # ── FSM States ───────────────────────────────────────────────────────────────
@@ -56,6 +77,7 @@ def main_menu_kb() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="2. Подписки", callback_data="menu:subscribe")],
         [InlineKeyboardButton(text="📊 Сводка уведомлений", callback_data="menu:summary")],
         [InlineKeyboardButton(text="📅 Дневной дайджест", callback_data="menu:digest")],
+        [InlineKeyboardButton(text="⏰ Период уведомлений", callback_data="menu:period")],
     ])
 
 
@@ -93,10 +115,29 @@ def new_subscribe_kb() -> InlineKeyboardMarkup:
     ])
 
 
-def notification_period_kb() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⬅️ Назад", callback_data="back:main")],
-    ])
+PERIOD_OPTIONS = {
+    0: "Мгновенно",
+    15: "Раз в 15 минут",
+    60: "Раз в час",
+}
+
+
+def notification_period_kb(policy: dict) -> InlineKeyboardMarkup:
+    interval = policy.get("interval", 0)
+    rows = [
+        [InlineKeyboardButton(
+            text=f"{'✅ ' if minutes == interval else ''}{label}",
+            callback_data=f"period:{minutes}",
+        )]
+        for minutes, label in PERIOD_OPTIONS.items()
+    ]
+    quiet_mark = "✅" if policy.get("quiet") else "⬜"
+    rows.append([InlineKeyboardButton(
+        text=f"{quiet_mark} Тихие часы {QUIET_HOURS[0]:02d}:00–{QUIET_HOURS[1]:02d}:00",
+        callback_data="period:quiet",
+    )])
+    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="back:main")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def summary_kb() -> InlineKeyboardMarkup:
@@ -515,15 +556,81 @@ async def unsubscribe_action(callback: CallbackQuery) -> None:
 
 
 
+# ── Период уведомлений ───────────────────────────────────────────────────────
+
+def _period_text(policy: dict) -> str:
+    interval = policy.get("interval", 0)
+    text = (
+        "⏰ <b>Период уведомлений</b>\n\n"
+        f"Доставка: {PERIOD_OPTIONS.get(interval, f'раз в {interval} мин')}\n"
+    )
+    if policy.get("quiet"):
+        start, end = policy["quiet"]
+        offset = policy.get("utc_offset", DEFAULT_UTC_OFFSET)
+        text += f"Тихие часы: {start:02d}:00–{end:02d}:00 (UTC{offset:+d})\n"
+    text += (
+        "\nПри отложенной доставке уведомления приходят одним сообщением.\n"
+        "<i>Авторизация и ошибки всегда приходят сразу.</i>"
+    )
+    return text
+
+
+@router.callback_query(F.data == "menu:period")
+async def menu_period(callback: CallbackQuery) -> None:
+    policy = await scheduler.policy(callback.from_user.id)
+    await callback.message.edit_text(
+        _period_text(policy),
+        parse_mode="HTML",
+        reply_markup=notification_period_kb(policy),
+    )
+    await _safe_answer(callback)
+
+
+@router.callback_query(F.data.startswith("period:"))
+async def period_select(callback: CallbackQuery) -> None:
+    telegram_id = callback.from_user.id
+    option = callback.data.split(":")[1]
+    policy = dict(await scheduler.policy(telegram_id))
+    if option == "quiet":
+        policy["quiet"] = None if policy.get("quiet") else list(QUIET_HOURS)
+    else:
+        policy["interval"] = int(option)
+
+    if not cache.available:
+        await callback.message.edit_text(
+            "⚠️ Настройка недоступна: Redis не подключён.",
+            reply_markup=main_menu_kb(),
+        )
+        await _safe_answer(callback)
+        return
+
+    await cache.set_delivery_policy(telegram_id, policy)
+    try:
+        await callback.message.edit_text(
+            _period_text(policy),
+            parse_mode="HTML",
+            reply_markup=notification_period_kb(policy),
+        )
+    except TelegramBadRequest:
+        pass  # message is not modified
+    await _safe_answer(callback)
+
+
 # ── Summary (ML) handlers ────────────────────────────────────────────────────
 
 @router.callback_query(F.data == "menu:summary")
 async def menu_summary(callback: CallbackQuery) -> None:
-    """Send summary request through microservice pipeline (DBService → Kafka → CoreService → MLService)."""
+    """Summarize recent notifications.
+
+    In direct mode MLService is called through MLClient and the answer is
+    shown inline (cached by notification list); otherwise, or if MLService
+    fails, the request goes through the async pipeline
+    (DBService → Kafka → CoreService → MLService).
+    """
     await _safe_answer(callback)
     telegram_id = callback.from_user.id
 
-    notifications = await cache.get_notification_history(telegram_id, limit=20)
+    notifications = await cache.get_notification_history(telegram_id, limit=SUMMARY_HISTORY_LIMIT)
     if not notifications:
         await callback.message.edit_text(
             "📊 <b>Сводка уведомлений</b>\n\n"
@@ -536,6 +643,88 @@ async def menu_summary(callback: CallbackQuery) -> None:
         )
         return
 
+    if SUMMARY_MODE == "direct" and await _summarize_direct(callback, notifications):
+        return
+
+    await _request_summary_pipeline(callback, telegram_id, notifications)
+
+
+def _summary_text(summary: str, count: int, partial: bool = False) -> str:
+    text = (
+        "📊 <b>Сводка уведомлений</b>\n"
+        f"{'─' * 20}\n"
+        f"{html.escape(summary)}"
+    )
+    if partial:
+        return text + " ▌"
+    return text + f"\n\n<i>По {count} последним уведомлениям</i>"
+
+
+async def _stream_summary(callback: CallbackQuery, notifications: list[str]) -> str | None:
+    """Stream the summary into the message, editing at most once per interval."""
+    summary = ""
+    last_edit = 0.0
+    try:
+        async for summary in ml.stream_summary(notifications, max_tokens=SUMMARY_MAX_TOKENS):
+            now = asyncio.get_running_loop().time()
+            if now - last_edit < SUMMARY_EDIT_INTERVAL:
+                continue
+            last_edit = now
+            try:
+                await callback.message.edit_text(
+                    _summary_text(summary, len(notifications), partial=True),
+                    parse_mode="HTML",
+                )
+            except TelegramBadRequest:
+                pass  # message is not modified
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            # Older MLService without /summarize/stream
+            return await ml.summarize(notifications, max_tokens=SUMMARY_MAX_TOKENS)
+        # Overloaded, not ready or past the deadline: a second request won't help
+        logging.warning(f"MLService streaming failed: {e.response.status_code}")
+        return None
+    except httpx.ConnectError:
+        logging.warning("MLService is not available")
+        return None
+    except Exception as e:
+        logging.warning(f"MLService streaming failed: {e}")
+        return None
+    return summary or None
+
+
+async def _summarize_direct(callback: CallbackQuery, notifications: list[str]) -> bool:
+    """Show an MLService summary inline; False means fall back to the pipeline."""
+    digest = summary_cache_key(notifications, SUMMARY_MAX_TOKENS)
+    summary = await cache.get_summary(digest)
+
+    if summary is None:
+        await callback.message.edit_text(
+            "📊 <b>Сводка уведомлений</b>\n\n"
+            f"⏳ Анализирую {len(notifications)} уведомлений с помощью AI…",
+            parse_mode="HTML",
+        )
+        if SUMMARY_STREAMING:
+            summary = await _stream_summary(callback, notifications)
+        else:
+            summary = await ml.summarize(notifications, max_tokens=SUMMARY_MAX_TOKENS)
+        if not summary:
+            return False
+        await cache.set_summary(digest, summary, ttl=SUMMARY_CACHE_TTL)
+
+    await callback.message.edit_text(
+        _summary_text(summary, len(notifications)),
+        parse_mode="HTML",
+        reply_markup=summary_kb(),
+    )
+    return True
+
+
+async def _request_summary_pipeline(
+    callback: CallbackQuery,
+    telegram_id: int,
+    notifications: list[str],
+) -> None:
     try:
         async with db:
             await db.request_summary(
@@ -642,14 +831,25 @@ async def handle_kafka_notification(notification_data: dict) -> None:
         plain_text = f"[{service}/{notif_type}] {title}"
         if message:
             plain_text += f": {message[:300]}"
-        await cache.push_notification(telegram_id, plain_text)
+        with span("redis.push_notification", telegram_id=telegram_id):
+            await cache.push_notification(telegram_id, plain_text)
 
-        await bot.send_message(
-            chat_id=telegram_id,
-            text=text,
-            parse_mode="HTML",
-            disable_web_page_preview=True,
-        )
+        # Users with a batched policy get it later as one combined message
+        if await scheduler.defer(telegram_id, notif_type, text):
+            logging.info(f"Notification deferred for user {telegram_id}")
+            return
+
+        async def send() -> None:
+            with span("telegram.send_message", telegram_id=telegram_id, type=notif_type):
+                await bot.send_message(
+                    chat_id=telegram_id,
+                    text=text,
+                    parse_mode="HTML",
+                    disable_web_page_preview=True,
+                )
+
+        # Queued in a priority lane by type and sent within the Telegram budget
+        await dispatcher.deliver(notif_type, send)
         
         logging.info(f"Notification sent to user {telegram_id}")
 
@@ -659,6 +859,23 @@ async def handle_kafka_notification(notification_data: dict) -> None:
         logging.error(f"Error handling Kafka notification: {e}", exc_info=True)
 
 
+async def send_batched(telegram_id: int, text: str) -> None:
+    """Deliver one combined message of deferred notifications."""
+    async def send() -> None:
+        with span("telegram.send_message", telegram_id=telegram_id, type="batch"):
+            await bot.send_message(
+                chat_id=telegram_id,
+                text=text,
+                parse_mode="HTML",
+                disable_web_page_preview=True,
+            )
+
+    try:
+        await dispatcher.deliver("batch", send)
+    except TelegramBadRequest as e:
+        logging.warning(f"Cannot send to chat {telegram_id}: {e}")
+
+
 def _format_notification(service: str, notif_type: str, title: str, message: str, url: str) -> str:
     """Build a rich formatted notification string."""
     icon = _get_icon(service, notif_type)
@@ -710,20 +927,74 @@ def _type_label(notif_type: str) -> str:
 
 # ── Entry point ──────────────────────────────────────────────────────────────
 
+async def _connect_redis() -> None:
+    await cache.connect()
+    if not cache.available:
+        raise RuntimeError("caching disabled")
+
+
 async def main() -> None:
+    global bot
     dp.include_router(router)
     logging.basicConfig(level=logging.INFO)
-    
-    # Connect Redis cache
-    await cache.connect()
-    
+    setup_tracing()
+    bot = Bot(token=BOT_TOKEN)
+
+    # Connect all dependencies concurrently; failures fall back to lazy connect
+    await warm_up(
+        {
+            "redis": _connect_redis,
+            "dbservice": db.warm_up,
+            "kafka": kafka_consumer.connect,
+            "telegram": bot.get_me,
+            **({"mlservice": ml.connect} if SUMMARY_MODE == "direct" else {}),
+        },
+        timeouts={"kafka": KAFKA_STARTUP_TIMEOUT},
+    )
+
+    dispatcher.start()
+    shutdown = _build_shutdown()
+    shutdown.install_signal_handlers()
     try:
         # Start bot and Kafka consumer in parallel
         async with asyncio.TaskGroup() as tg:
-            tg.create_task(dp.start_polling(bot))
+            tg.create_task(dp.start_polling(bot, handle_signals=False))
             tg.create_task(kafka_consumer.start(handle_kafka_notification))
+            tg.create_task(scheduler.run(send_batched))
+            tg.create_task(shutdown.run_on_request())
     finally:
-        await cache.close()
+        await shutdown.run()
+
+
+def _build_shutdown() -> ShutdownCoordinator:
+    """Stop intake, drain deliveries, commit offsets, then close clients."""
+    shutdown = ShutdownCoordinator()
+
+    async def stop_fetching() -> None:
+        kafka_consumer.stop_fetching()
+        scheduler.stop()
+        try:
+            await dp.stop_polling()
+        except RuntimeError:
+            pass  # polling was never started
+
+    async def drain() -> None:
+        await asyncio.gather(
+            kafka_consumer.drain(SHUTDOWN_DRAIN_TIMEOUT),
+            asyncio.wait_for(scheduler.wait_stopped(), SHUTDOWN_DRAIN_TIMEOUT),
+        )
+
+    shutdown.add_step("stop fetching", stop_fetching)
+    shutdown.add_step("drain deliveries", drain, timeout=SHUTDOWN_DRAIN_TIMEOUT + 5)
+    shutdown.add_step("stop senders", dispatcher.stop)
+    shutdown.add_step("commit offsets", kafka_consumer.commit)
+    shutdown.add_step("close kafka", kafka_consumer.stop)
+    shutdown.add_step("close telegram", bot.session.close)
+    shutdown.add_step("close dbservice", db.close)
+    shutdown.add_step("close mlservice", ml.close)
+    shutdown.add_step("close redis", cache.close)
+    shutdown.add_step("flush traces", lambda: asyncio.to_thread(shutdown_tracing))
+    return shutdown
 
 
 if __name__ == "__main__":
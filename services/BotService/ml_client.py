@@ -1,8 +1,11 @@
 """HTTP client for MLService summarization API."""
 
+import asyncio
+import hashlib
+import json
 import logging
 import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 import httpx
 from dotenv import load_dotenv
@@ -10,16 +13,63 @@ from dotenv import load_dotenv
 load_dotenv()
 
 ML_SERVICE_URL = os.getenv("ML_SERVICE_URL", "http://localhost:8042")
+ML_MAX_CONCURRENCY = int(os.getenv("ML_MAX_CONCURRENCY", "4"))
 
 logger = logging.getLogger(__name__)
 
 
+def summary_cache_key(notifications: list[str], max_tokens: int) -> str:
+    """Stable hash of a summarize request, used as the result cache key."""
+    payload = json.dumps([notifications, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 class MLClient:
-    """Async HTTP client for MLService."""
+    """Async HTTP client for MLService.
+
+    One pooled ``httpx.AsyncClient`` is shared by all calls, and at most
+    ``max_concurrency`` summarize requests are in flight at once; further
+    callers wait for a slot instead of piling onto the model.
+    """
 
-    def __init__(self, base_url: str = ML_SERVICE_URL, timeout: float = 120.0):
+    def __init__(
+        self,
+        base_url: str = ML_SERVICE_URL,
+        timeout: float = 120.0,
+        max_concurrency: int = ML_MAX_CONCURRENCY,
+    ):
         self.base_url = base_url
         self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def connect(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            # Bot requests are interactive; MLService drops them once we
+            # would have timed out anyway
+            headers={
+                "X-Priority": "interactive",
+                "X-Request-Timeout": str(self.timeout),
+            },
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency + 2,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+
+    async def close(self) -> None:
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        await self.connect()
+        return self._client
 
     async def summarize(
         self,
@@ -33,33 +83,97 @@ class MLClient:
         if not notifications:
             return None
 
+        client = await self._get_client()
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with self._slots:
                 response = await client.post(
-                    f"{self.base_url}/summarize",
+                    "/summarize",
                     json={
                         "notifications": notifications,
                         "max_tokens": max_tokens,
                     },
                 )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("summary")
+            response.raise_for_status()
+            data = response.json()
+            return data.get("summary")
         except httpx.ConnectError:
             logger.warning("MLService is not available")
             return None
         except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                retry_after = e.response.headers.get("Retry-After", "?")
+                logger.warning(f"MLService is overloaded, retry after {retry_after}s")
+                return None
             logger.error(f"MLService returned error: {e.response.status_code}")
             return None
         except Exception as e:
             logger.error(f"MLService request failed: {e}", exc_info=True)
             return None
 
+    async def stream_summary(
+        self,
+        notifications: list[str],
+        max_tokens: int = 100,
+    ) -> AsyncIterator[str]:
+        """Yield the summary text generated so far as MLService streams it.
+
+        Reads NDJSON from ``/summarize/stream``: ``{"token": ...}`` lines
+        followed by ``{"done": true, "summary": ...}``. Raises ``httpx``
+        errors, so callers can fall back to :meth:`summarize`.
+        """
+        if not notifications:
+            return
+
+        client = await self._get_client()
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def read() -> None:
+            # The slot covers reading the response only, not the caller's
+            # handling of each piece (e.g. rate-limited message edits)
+            try:
+                async with self._slots:
+                    async with client.stream(
+                        "POST",
+                        "/summarize/stream",
+                        json={
+                            "notifications": notifications,
+                            "max_tokens": max_tokens,
+                        },
+                    ) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if line.strip():
+                                events.put_nowait(json.loads(line))
+                events.put_nowait(None)
+            except Exception as e:
+                events.put_nowait(e)
+
+        reader = asyncio.create_task(read())
+        text = ""
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    return
+                if isinstance(event, Exception):
+                    raise event
+                if "error" in event:
+                    raise RuntimeError(f"MLService stream failed: {event['error']}")
+                if event.get("done"):
+                    final = event.get("summary")
+                    if final is not None and final != text:
+                        yield final
+                    return
+                text += event.get("token", "")
+                yield text
+        finally:
+            reader.cancel()
+
     async def health(self) -> bool:
         """Check if MLService is healthy."""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/health")
-                return response.status_code == 200
+            client = await self._get_client()
+            response = await client.get("/health", timeout=5.0)
+            return response.status_code == 200
         except Exception:
             return False
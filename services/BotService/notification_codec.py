@@ -0,0 +1,150 @@
+"""Wire encodings for records of the Notifications topic.
+
+The encoding of a record is named in the ``notification-encoding`` Kafka
+header. Records without the header are JSON, which is what every producer
+wrote before the binary format existed.
+
+Binary format, version 1 (all integers big-endian)::
+
+    u8   version            = 1
+    i64  telegram_id
+    u8   type code          index in TYPES, 0xFF = inline string follows
+    u8   service code       index in SERVICES, 0xFF = inline string follows
+    u8   flags              bit 0 title, bit 1 message, bit 2 url present
+    str  [type] [service] [title] [message] [url]
+
+``str`` is a varint byte length followed by UTF-8 bytes.
+"""
+
+import json
+import struct
+from typing import Optional
+
+ENCODING_HEADER = "notification-encoding"
+ENCODING_JSON = "json"
+ENCODING_BINARY = "nbin"
+
+BINARY_VERSION = 1
+
+# Append only: codes are part of the wire format
+TYPES = (
+    "", "auth", "issue", "commit", "pull_request", "branch",
+    "actions", "error", "new_answer", "new_comment",
+)
+SERVICES = ("", "github", "stackoverflow")
+
+_TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+_SERVICE_CODES = {name: code for code, name in enumerate(SERVICES)}
+_INLINE = 0xFF
+_HEAD = struct.Struct(">BqBBB")
+_OPTIONAL_FIELDS = ("title", "message", "url")
+_KNOWN_FIELDS = {"telegram_id", "type", "service", *_OPTIONAL_FIELDS}
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    data = value.encode("utf-8")
+    length = len(data)
+    while length >= 0x80:
+        out.append((length & 0x7F) | 0x80)
+        length >>= 7
+    out.append(length)
+    out += data
+
+
+def _read_str(buf: bytes, pos: int) -> tuple[str, int]:
+    length = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        length |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    end = pos + length
+    if end > len(buf):
+        raise ValueError("truncated binary notification")
+    return buf[pos:end].decode("utf-8"), end
+
+
+def encode_binary(notification: dict) -> bytes:
+    """Encode a notification dict; raises ValueError if it does not fit v1"""
+    extra = notification.keys() - _KNOWN_FIELDS
+    if extra:
+        raise ValueError(f"fields not in binary schema: {sorted(extra)}")
+
+    notif_type = notification.get("type") or ""
+    service = notification.get("service") or ""
+    type_code = _TYPE_CODES.get(notif_type, _INLINE)
+    service_code = _SERVICE_CODES.get(service, _INLINE)
+    flags = 0
+    for bit, field in enumerate(_OPTIONAL_FIELDS):
+        if notification.get(field) is not None:
+            flags |= 1 << bit
+
+    out = bytearray(_HEAD.pack(
+        BINARY_VERSION, int(notification["telegram_id"]), type_code, service_code, flags,
+    ))
+    if type_code == _INLINE:
+        _write_str(out, notif_type)
+    if service_code == _INLINE:
+        _write_str(out, service)
+    for field in _OPTIONAL_FIELDS:
+        if notification.get(field) is not None:
+            _write_str(out, str(notification[field]))
+    return bytes(out)
+
+
+def decode_binary(raw: bytes) -> dict:
+    if not raw or raw[0] != BINARY_VERSION:
+        raise ValueError(f"unsupported binary notification version: {raw[:1]!r}")
+    _, telegram_id, type_code, service_code, flags = _HEAD.unpack_from(raw)
+    pos = _HEAD.size
+
+    if type_code == _INLINE:
+        notif_type, pos = _read_str(raw, pos)
+    else:
+        notif_type = TYPES[type_code]
+    if service_code == _INLINE:
+        service, pos = _read_str(raw, pos)
+    else:
+        service = SERVICES[service_code]
+
+    notification = {"telegram_id": telegram_id}
+    if notif_type:
+        notification["type"] = notif_type
+    if service:
+        notification["service"] = service
+    for bit, field in enumerate(_OPTIONAL_FIELDS):
+        if flags & (1 << bit):
+            notification[field], pos = _read_str(raw, pos)
+    return notification
+
+
+def encode(notification: dict, encoding: str = ENCODING_JSON) -> tuple[bytes, str]:
+    """Serialize with the requested encoding, falling back to JSON.
+
+    Returns the payload and the encoding actually used (for the header).
+    """
+    if encoding == ENCODING_BINARY:
+        try:
+            return encode_binary(notification), ENCODING_BINARY
+        except (ValueError, TypeError, KeyError):
+            pass
+    return json.dumps(notification, ensure_ascii=False).encode("utf-8"), ENCODING_JSON
+
+
+def header_encoding(headers) -> Optional[str]:
+    for key, value in headers or ():
+        if key == ENCODING_HEADER:
+            return value.decode("ascii") if isinstance(value, bytes) else value
+    return None
+
+
+def decode(raw: bytes, headers=None) -> dict:
+    """Decode a record value according to its encoding header"""
+    encoding = header_encoding(headers)
+    if encoding == ENCODING_BINARY:
+        return decode_binary(raw)
+    if encoding not in (None, ENCODING_JSON):
+        raise ValueError(f"unknown notification encoding: {encoding}")
+    return json.loads(raw.decode("utf-8"))
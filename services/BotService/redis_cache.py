@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+import time
 from typing import Any, Optional
 
 from dotenv import load_dotenv
@@ -8,6 +9,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+# After a failed connect, the next call retries at most this often (seconds)
+REDIS_RECONNECT_INTERVAL = float(os.getenv("REDIS_RECONNECT_INTERVAL", "30"))
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +21,11 @@ class RedisCache:
         self.url = url
         self.default_ttl = default_ttl
         self._redis = None
+        # When to retry a failed connect; None = not attempted or not retried
+        self._retry_at: Optional[float] = None
 
     async def connect(self) -> None:
+        self._retry_at = None
         try:
             import redis.asyncio as aioredis
             self._redis = aioredis.from_url(
@@ -33,8 +39,18 @@ class RedisCache:
             logger.warning("redis package not installed, caching disabled")
             self._redis = None
         except Exception as e:
-            logger.warning(f"Redis connection failed, caching disabled: {e}")
+            logger.warning(
+                f"Redis connection failed, caching disabled until reconnect "
+                f"(in {REDIS_RECONNECT_INTERVAL:.0f}s): {e}"
+            )
             self._redis = None
+            self._retry_at = time.monotonic() + REDIS_RECONNECT_INTERVAL
+
+    async def _connected(self) -> bool:
+        """Whether Redis is usable, reconnecting lazily after a failed connect"""
+        if self._redis is None and self._retry_at is not None and time.monotonic() >= self._retry_at:
+            await self.connect()
+        return self._redis is not None
 
     async def close(self) -> None:
         if self._redis:
@@ -45,7 +61,7 @@ class RedisCache:
         return self._redis is not None
 
     async def get(self, key: str) -> Optional[Any]:
-        if not self._redis:
+        if not await self._connected():
             return None
         try:
             value = await self._redis.get(f"bot:{key}")
@@ -57,7 +73,7 @@ class RedisCache:
             return None
 
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        if not self._redis:
+        if not await self._connected():
             return
         try:
             serialized = json.dumps(value, default=str)
@@ -66,7 +82,7 @@ class RedisCache:
             logger.debug(f"Redis set error for {key}: {e}")
 
     async def delete(self, key: str) -> None:
-        if not self._redis:
+        if not await self._connected():
             return
         try:
             await self._redis.delete(f"bot:{key}")
@@ -74,7 +90,7 @@ class RedisCache:
             logger.debug(f"Redis delete error for {key}: {e}")
 
     async def delete_pattern(self, pattern: str) -> None:
-        if not self._redis:
+        if not await self._connected():
             return
         try:
             keys = []
@@ -103,19 +119,28 @@ class RedisCache:
     async def invalidate_subscriptions(self, telegram_id: int) -> None:
         await self.delete(f"subs:{telegram_id}")
 
+    async def get_summary(self, digest: str) -> Optional[str]:
+        return await self.get(f"summary:{digest}")
+
+    async def set_summary(self, digest: str, summary: str, ttl: int) -> None:
+        await self.set(f"summary:{digest}", summary, ttl=ttl)
+
     async def push_notification(
         self,
         telegram_id: int,
         text: str,
         max_stored: int = 50,
     ) -> None:
-        if not self._redis:
+        if not await self._connected():
             return
         key = f"bot:notif_history:{telegram_id}"
         try:
-            await self._redis.lpush(key, text)
-            await self._redis.ltrim(key, 0, max_stored - 1)
-            await self._redis.expire(key, 60 * 60 * 24 * 7)
+            # One round trip, so a cancelled write never leaves the list untrimmed
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.lpush(key, text)
+                pipe.ltrim(key, 0, max_stored - 1)
+                pipe.expire(key, 60 * 60 * 24 * 7)
+                await pipe.execute()
         except Exception as e:
             logger.debug(f"Redis push_notification error: {e}")
 
@@ -124,7 +149,7 @@ class RedisCache:
         telegram_id: int,
         limit: int = 20,
     ) -> list[str]:
-        if not self._redis:
+        if not await self._connected():
             return []
         key = f"bot:notif_history:{telegram_id}"
         try:
@@ -135,7 +160,7 @@ class RedisCache:
             return []
 
     async def clear_notification_history(self, telegram_id: int) -> None:
-        if not self._redis:
+        if not await self._connected():
             return
         try:
             await self._redis.delete(f"bot:notif_history:{telegram_id}")
@@ -143,7 +168,7 @@ class RedisCache:
             logger.debug(f"Redis clear_notification_history error: {e}")
 
     async def get_daily_summary(self, telegram_id: int) -> str | None:
-        if not self._redis:
+        if not await self._connected():
             return None
         try:
             value = await self._redis.get(f"bot:daily_summary:{telegram_id}")
@@ -151,3 +176,70 @@ class RedisCache:
         except Exception as e:
             logger.debug(f"Redis get_daily_summary error: {e}")
             return None
+
+    # ── Scheduled (batched) delivery ─────────────────────────────────────────
+
+    async def get_delivery_policy(self, telegram_id: int) -> Optional[dict]:
+        return await self.get(f"delivery_policy:{telegram_id}")
+
+    async def set_delivery_policy(self, telegram_id: int, policy: dict) -> None:
+        if not await self._connected():
+            return
+        try:
+            await self._redis.set(
+                f"bot:delivery_policy:{telegram_id}",
+                json.dumps(policy),
+            )
+        except Exception as e:
+            logger.debug(f"Redis set_delivery_policy error: {e}")
+
+    async def defer_notification(self, telegram_id: int, text: str, due: float) -> bool:
+        """Append to the user's deferred list and arm the timer if unarmed.
+
+        Returns False when Redis is unavailable and the caller must send now.
+        """
+        if not await self._connected():
+            return False
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(f"bot:deferred:{telegram_id}", text)
+                # NX: the earliest pending notification decides the flush time
+                pipe.zadd("bot:delivery_timer", {str(telegram_id): due}, nx=True)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.debug(f"Redis defer_notification error: {e}")
+            return False
+
+    async def due_deferred_users(self, now: float, limit: int) -> list[int]:
+        if not await self._connected():
+            return []
+        try:
+            members = await self._redis.zrangebyscore(
+                "bot:delivery_timer", "-inf", now, start=0, num=limit,
+            )
+            return [int(m) for m in members]
+        except Exception as e:
+            logger.debug(f"Redis due_deferred_users error: {e}")
+            return []
+
+    async def claim_deferred(self, telegram_id: int) -> list[str]:
+        """Take all deferred notifications of a due user.
+
+        ZREM is the claim: only the replica that removed the timer entry
+        reads and clears the list.
+        """
+        if not await self._connected():
+            return []
+        try:
+            if not await self._redis.zrem("bot:delivery_timer", str(telegram_id)):
+                return []
+            key = f"bot:deferred:{telegram_id}"
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.lrange(key, 0, -1)
+                pipe.delete(key)
+                items, _ = await pipe.execute()
+            return items or []
+        except Exception as e:
+            logger.debug(f"Redis claim_deferred error: {e}")
+            return []
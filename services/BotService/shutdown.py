@@ -0,0 +1,79 @@
+"""Ordered graceful shutdown for BotService."""
+
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "25"))
+SHUTDOWN_STEP_TIMEOUT = float(os.getenv("SHUTDOWN_STEP_TIMEOUT", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class ShutdownCoordinator:
+    """Runs registered shutdown steps one after another, in order.
+
+    Every step has its own deadline; a failing step is logged and the
+    remaining ones still run, so clients are always closed.
+    """
+
+    def __init__(self, step_timeout: float = SHUTDOWN_STEP_TIMEOUT):
+        self.step_timeout = step_timeout
+        self._steps: list[tuple[str, Callable[[], Awaitable], float]] = []
+        self._requested = asyncio.Event()
+        self._finished = False
+
+    def add_step(
+        self,
+        name: str,
+        step: Callable[[], Awaitable],
+        timeout: Optional[float] = None,
+    ) -> None:
+        self._steps.append((name, step, timeout or self.step_timeout))
+
+    def install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.request, sig.name)
+            except NotImplementedError:
+                # Windows event loops do not support signal handlers
+                pass
+
+    def request(self, reason: str = "requested") -> None:
+        if not self._requested.is_set():
+            logger.info(f"Shutdown {reason}, draining in-flight work …")
+            self._requested.set()
+
+    async def wait(self) -> None:
+        await self._requested.wait()
+
+    async def run(self) -> None:
+        """Execute all steps once; later calls are no-ops"""
+        if self._finished:
+            return
+        self._finished = True
+        self._requested.set()
+
+        started = time.perf_counter()
+        for name, step, timeout in self._steps:
+            step_started = time.perf_counter()
+            try:
+                await asyncio.wait_for(step(), timeout=timeout)
+                logger.info(f"  {name:<18} done in {(time.perf_counter() - step_started) * 1000:.0f} ms")
+            except asyncio.TimeoutError:
+                logger.warning(f"  {name:<18} exceeded {timeout:.1f}s deadline")
+            except Exception as e:
+                logger.error(f"  {name:<18} failed: {e}")
+        logger.info(f"Shutdown complete in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    async def run_on_request(self) -> None:
+        await self.wait()
+        await self.run()
@@ -0,0 +1,69 @@
+"""Concurrent dependency warm-up for BotService startup."""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STARTUP_TIMEOUT = float(os.getenv("STARTUP_TIMEOUT", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmUpResult:
+    name: str
+    ok: bool
+    elapsed: float
+    error: Optional[str] = None
+
+
+async def _run_step(
+    name: str,
+    step: Callable[[], Awaitable],
+    timeout: float,
+) -> WarmUpResult:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(step(), timeout=timeout)
+        return WarmUpResult(name, True, time.perf_counter() - started)
+    except asyncio.TimeoutError:
+        error = f"deadline of {timeout:.1f}s exceeded"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    return WarmUpResult(name, False, time.perf_counter() - started, error)
+
+
+async def warm_up(
+    steps: dict[str, Callable[[], Awaitable]],
+    timeout: float = STARTUP_TIMEOUT,
+    timeouts: Optional[dict[str, float]] = None,
+) -> dict[str, WarmUpResult]:
+    """Run all warm-up steps concurrently, each under its own deadline.
+
+    A failed or slow dependency never blocks the others: it is logged and
+    left to connect lazily on first use.
+    """
+    timeouts = timeouts or {}
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        _run_step(name, step, timeouts.get(name, timeout))
+        for name, step in steps.items()
+    ))
+    total = time.perf_counter() - started
+
+    logger.info(f"Startup warm-up finished in {total * 1000:.0f} ms")
+    for result in results:
+        if result.ok:
+            logger.info(f"  {result.name:<10} ready in {result.elapsed * 1000:.0f} ms")
+        else:
+            logger.warning(
+                f"  {result.name:<10} failed after {result.elapsed * 1000:.0f} ms: {result.error}"
+            )
+    return {result.name: result for result in results}
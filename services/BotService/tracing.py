@@ -0,0 +1,129 @@
+"""Optional OpenTelemetry tracing for the notification delivery path.
+
+Tracing is off unless ``TRACING_ENABLED`` is set and the opentelemetry
+packages are installed; in that case ``span()`` is a no-op context manager.
+"""
+
+import logging
+import os
+from contextlib import nullcontext
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "0.01"))
+# "otlp" (local collector), "file" (JSON lines) or "console"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "otlp")
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+SERVICE_NAME = "bot-service"
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+_propagator = None
+_NOOP = nullcontext()
+
+
+def setup_tracing() -> None:
+    """Install the tracer provider; leaves tracing disabled on any problem."""
+    global _tracer, _propagator
+    if not TRACING_ENABLED:
+        return
+    try:
+        from opentelemetry import propagate, trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.warning("opentelemetry packages not installed, tracing disabled")
+        return
+
+    try:
+        exporter = _build_exporter()
+    except Exception as e:
+        logger.warning(f"Trace exporter setup failed, tracing disabled: {e}")
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(__name__)
+    _propagator = propagate.get_global_textmap()
+    logger.info(
+        f"Tracing enabled: exporter={TRACING_EXPORTER}, sample_ratio={TRACING_SAMPLE_RATIO}"
+    )
+
+
+def _build_exporter():
+    if TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        # Endpoint is taken from OTEL_EXPORTER_OTLP_ENDPOINT (default localhost:4317)
+        return OTLPSpanExporter()
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+    if TRACING_EXPORTER == "file":
+        return ConsoleSpanExporter(
+            out=open(TRACING_FILE, "a", encoding="utf-8"),
+            formatter=lambda s: s.to_json(indent=None) + "\n",
+        )
+    return ConsoleSpanExporter()
+
+
+def shutdown_tracing() -> None:
+    """Flush buffered spans to the exporter"""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+def span(name: str, context: Optional[Any] = None, **attributes: Any):
+    """Start a span as the current span, or do nothing if tracing is off."""
+    if _tracer is None:
+        return _NOOP
+    return _tracer.start_as_current_span(name, context=context, attributes=attributes)
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Attach attributes to the current span (``None`` values are skipped)"""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+class _HeaderGetter:
+    """Reads W3C trace context out of Kafka ``(key, bytes)`` header tuples"""
+
+    def get(self, carrier: dict, key: str) -> Optional[list[str]]:
+        value = carrier.get(key)
+        return [value] if value is not None else None
+
+    def keys(self, carrier: dict) -> list[str]:
+        return list(carrier)
+
+
+_header_getter = _HeaderGetter()
+
+
+def extract_context(headers) -> Optional[Any]:
+    """Parent context propagated by the producer via Kafka headers, if any"""
+    if _propagator is None or not headers:
+        return None
+    carrier = {
+        key: value.decode("utf-8", "replace") if isinstance(value, bytes) else value
+        for key, value in headers
+    }
+    return _propagator.extract(carrier, getter=_header_getter)
@@ -0,0 +1,146 @@
+"""
+Admission control for summarize requests.
+
+At most ``max_in_flight`` requests are handed to the scheduler at once;
+the rest wait here, interactive (bot) requests ahead of batch (Airflow)
+ones. The waiting room is bounded: when it is full the request is
+rejected right away with a ``Retry-After`` estimate instead of queueing
+until the client times out. Batch traffic may only fill part of it, so
+interactive requests are still admitted while a DAG run is in progress.
+A request whose deadline passes while it waits is dropped.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+
+class Overloaded(Exception):
+    """The waiting room is full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The client's deadline passed before the request could run."""
+
+
+class AdmissionController:
+    """Bounded, prioritized waiting room in front of the scheduler."""
+
+    def __init__(self, max_in_flight: int, max_queue: int, batch_queue_share: float = 0.5):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.batch_queue_limit = max(1, int(max_queue * batch_queue_share))
+        self.in_flight = 0
+        # (priority, seq, future) – futures are resolved when a slot frees up
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.queued = {INTERACTIVE: 0, BATCH: 0}
+        self.admitted = {INTERACTIVE: 0, BATCH: 0}
+        self.rejected = {INTERACTIVE: 0, BATCH: 0}
+        self.expired = {INTERACTIVE: 0, BATCH: 0}
+        # Moving average of how long a request holds a slot
+        self._service_seconds = 1.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(self.queued.values())
+
+    def retry_after(self) -> int:
+        """Seconds until the current waiting room has likely drained."""
+        rounds = (self.waiting + 1) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(rounds * self._service_seconds))
+
+    @asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE, deadline: Optional[float] = None):
+        """Hold one scheduler slot; ``deadline`` is a ``time.monotonic()`` value."""
+        started = await self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release(started)
+
+    async def acquire(self, priority: str = INTERACTIVE, deadline: Optional[float] = None) -> float:
+        """Wait for a slot; returns the admission time to pass to :meth:`release`.
+
+        Raises :class:`Overloaded` when the waiting room is full and
+        :class:`DeadlineExceeded` when ``deadline`` passes first.
+        """
+        await self._acquire(priority, deadline)
+        self.admitted[priority] += 1
+        return time.monotonic()
+
+    def release(self, started: float) -> None:
+        elapsed = time.monotonic() - started
+        self._service_seconds = 0.8 * self._service_seconds + 0.2 * elapsed
+        self._release()
+
+    async def _acquire(self, priority: str, deadline: Optional[float]) -> None:
+        if deadline is not None and deadline <= time.monotonic():
+            self.expired[priority] += 1
+            raise DeadlineExceeded()
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            self.in_flight += 1
+            return
+
+        limit = self.batch_queue_limit if priority == BATCH else self.max_queue
+        if self.waiting >= limit:
+            self.rejected[priority] += 1
+            retry_after = self.retry_after()
+            logger.warning(
+                f"Rejected {priority} request: {self.waiting} waiting, retry after {retry_after}s"
+            )
+            raise Overloaded(retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (PRIORITIES[priority], next(self._seq), future))
+        self.queued[priority] += 1
+        timeout = deadline - time.monotonic() if deadline is not None else None
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we gave up: pass it on
+                self._release()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.expired[priority] += 1
+                raise DeadlineExceeded() from None
+            raise
+        finally:
+            self.queued[priority] -= 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+                return
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "waiting": dict(self.queued),
+            "max_queue": self.max_queue,
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+            "expired": dict(self.expired),
+        }
@@ -0,0 +1,399 @@
+"""
+Inference backends.
+
+Everything that runs the model (server, evaluation, CLI inference,
+benchmark) goes through the :class:`Backend` interface, so MLService is not
+tied to Apple Silicon:
+
+- ``mlx``      – mlx-lm with LoRA adapters (Apple Silicon, the default)
+- ``llamacpp`` – llama.cpp on CPU via llama-cpp-python, from a GGUF file
+- ``fake``     – deterministic, model-free output for tests and load tests
+
+The backend is chosen with ``ML_BACKEND`` (default ``config.BACKEND``).
+"""
+
+import hashlib
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from config import (
+    BACKEND,
+    DRAFT_MODEL,
+    GGUF_PATH,
+    MAX_SEQ_LENGTH,
+    NUM_DRAFT_TOKENS,
+    SPECULATIVE_MIN_ACCEPTANCE,
+    SPECULATIVE_PROBE_EVERY,
+    SPECULATIVE_RETRY_AFTER,
+    SPECULATIVE_WINDOW,
+)
+
+from prepare import MANIFEST
+from speculative import SpeculativeController
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """Interface every backend implements.
+
+    Methods are blocking and are called from one thread at a time (the
+    inference worker thread in the server).
+    """
+
+    name = "base"
+    # Whether ``stream`` generators may be paused between pieces while
+    # other generations run (inference.InferenceScheduler interleaves them)
+    interleaved_streams = True
+
+    def __init__(self):
+        self.identity = ""
+
+    def load(self, model_name: str, adapter_path: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def load_tokenizer(self, model_name: str, adapter_path: Optional[str] = None) -> None:
+        """Load only what ``count_tokens`` and ``identity`` need.
+
+        Used by the front end when the model itself runs in worker
+        processes (worker_pool.py).
+        """
+        self.load(model_name, adapter_path=adapter_path)
+
+    def count_tokens(self, text: str) -> int:
+        raise NotImplementedError
+
+    def generate(self, prompt: str, max_tokens: int) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        """Yield decoded text pieces as they are generated."""
+        yield self.generate(prompt, max_tokens)
+
+    def batch_generate(self, prompts: list[str], max_tokens: list[int]) -> list[str]:
+        """One completion per prompt, each limited to its own ``max_tokens``."""
+        return [self.generate(prompt, limit) for prompt, limit in zip(prompts, max_tokens)]
+
+    def set_prompt_prefix(self, prefix: str) -> None:
+        """Hint that most prompts start with ``prefix`` (for KV-cache reuse)."""
+
+    def peak_memory(self) -> Optional[int]:
+        """Peak accelerator memory in bytes, if the backend tracks it."""
+        return None
+
+    def stats(self) -> dict:
+        return {}
+
+
+def _file_identity(path: Path) -> str:
+    stat = path.stat()
+    return f"{path}@{stat.st_size}:{int(stat.st_mtime)}"
+
+
+# ── MLX ───────────────────────────────────────────────────────────────────────
+
+
+class MLXBackend(Backend):
+    """mlx-lm model with optional LoRA adapters.
+
+    With a draft model configured (``DRAFT_MODEL`` / ``ML_DRAFT_MODEL``),
+    single-prompt and streaming generation use speculative decoding; see
+    speculative.py for the acceptance tracking and automatic fallback.
+    """
+
+    name = "mlx"
+
+    def __init__(self):
+        super().__init__()
+        self.model = None
+        self.tokenizer = None
+        self.prefix_cache = None
+        self.draft_model = None
+        self.speculative: Optional[SpeculativeController] = None
+
+    def load(self, model_name: str, adapter_path: Optional[str] = None) -> None:
+        from mlx_lm import load
+
+        self.model, self.tokenizer = load(model_name, adapter_path=adapter_path)
+        self._identify(model_name, adapter_path)
+        self._load_draft(os.getenv("ML_DRAFT_MODEL", DRAFT_MODEL or ""))
+
+    def _load_draft(self, draft_name: str) -> None:
+        """Load the draft model; serve without speculation if it doesn't fit."""
+        if not draft_name:
+            return
+        from mlx_lm import load
+
+        try:
+            draft_model, draft_tokenizer = load(draft_name)
+        except Exception as e:
+            logger.warning(f"Draft model {draft_name} failed to load, speculative decoding disabled: {e}")
+            return
+        if draft_tokenizer.vocab_size != self.tokenizer.vocab_size:
+            logger.warning(
+                f"Draft model {draft_name} has a different vocabulary, speculative decoding disabled"
+            )
+            return
+        self.draft_model = draft_model
+        self.speculative = SpeculativeController(
+            num_draft_tokens=int(os.getenv("ML_NUM_DRAFT_TOKENS", NUM_DRAFT_TOKENS)),
+            min_acceptance=SPECULATIVE_MIN_ACCEPTANCE,
+            window=SPECULATIVE_WINDOW,
+            retry_after=SPECULATIVE_RETRY_AFTER,
+            probe_every=SPECULATIVE_PROBE_EVERY,
+        )
+        logger.info(f"Speculative decoding enabled with draft model {draft_name}")
+
+    def load_tokenizer(self, model_name: str, adapter_path: Optional[str] = None) -> None:
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self._identify(model_name, adapter_path)
+
+    def _identify(self, model_name: str, adapter_path: Optional[str]) -> None:
+        self.identity = model_name
+        manifest = Path(model_name) / MANIFEST
+        if manifest.exists():
+            # A prepared model is rewritten in place by `main.py prepare`
+            self.identity = _file_identity(manifest)
+        if adapter_path is not None:
+            # Retrained adapters must not reuse results cached for old ones
+            weights = Path(adapter_path) / "adapters.safetensors"
+            adapter_id = _file_identity(weights) if weights.exists() else adapter_path
+            self.identity = f"{model_name}+{adapter_id}"
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def set_prompt_prefix(self, prefix: str) -> None:
+        from prefix_cache import PrefixCache
+
+        try:
+            cache = PrefixCache(self.model, self.tokenizer, prefix)
+            cache.build()
+            self.prefix_cache = cache
+        except Exception as e:
+            logger.warning(f"Prefix cache unavailable, prompts prefilled in full: {e}")
+
+    def _prepare(self, prompt: str) -> tuple[str | list[int], dict]:
+        """Prompt to feed and extra kwargs, reusing the prefix cache."""
+        if self.prefix_cache is None:
+            return prompt, {}
+        tokens, cache = self.prefix_cache.split(prompt)
+        if cache is None:
+            return tokens, {}
+        return tokens, {"prompt_cache": cache}
+
+    def _release(self, kwargs: dict) -> None:
+        """Hand the request's prefix cache back for reuse."""
+        if "prompt_cache" in kwargs:
+            self.prefix_cache.release(kwargs["prompt_cache"])
+
+    def generate(self, prompt: str, max_tokens: int) -> str:
+        if self.speculative is not None:
+            return "".join(self.stream(prompt, max_tokens))
+
+        from mlx_lm import generate
+
+        prompt, kwargs = self._prepare(prompt)
+        try:
+            return generate(
+                self.model, self.tokenizer, prompt=prompt, max_tokens=max_tokens, verbose=False, **kwargs,
+            )
+        finally:
+            self._release(kwargs)
+
+    def stream(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        from mlx_lm import stream_generate
+
+        speculative = self.speculative is not None and self.speculative.use_draft()
+        if speculative:
+            # The prefix cache only holds the main model's KV state, so a
+            # speculative run prefills the full prompt on both models
+            kwargs = {
+                "draft_model": self.draft_model,
+                "num_draft_tokens": self.speculative.num_draft_tokens,
+            }
+        else:
+            prompt, kwargs = self._prepare(prompt)
+
+        tokens = accepted = 0
+        first_token_at = None
+        try:
+            for response in stream_generate(
+                self.model, self.tokenizer, prompt, max_tokens=max_tokens, **kwargs,
+            ):
+                tokens += 1
+                accepted += bool(getattr(response, "from_draft", False))
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                # Newer mlx-lm yields GenerationResponse objects, older plain strings
+                yield getattr(response, "text", response)
+        finally:
+            self._release(kwargs)
+            if self.speculative is not None and first_token_at is not None:
+                # Decode speed only: prefill differs between the two modes
+                self.speculative.record(
+                    speculative, tokens, accepted, time.perf_counter() - first_token_at,
+                )
+
+    def batch_generate(self, prompts: list[str], max_tokens: list[int]) -> list[str]:
+        import mlx_lm
+
+        if len(prompts) == 1:
+            # A lone job takes the single-request path: prefix cache and,
+            # when configured, the draft model
+            return [self.generate(prompts[0], max_tokens[0])]
+
+        if hasattr(mlx_lm, "batch_generate"):
+            # mlx_lm.batch_generate builds its own batched KV cache and has no
+            # draft model, so these prompts are prefilled in full and decoded
+            # plainly; both are counted in the stats
+            if self.prefix_cache is not None:
+                self.prefix_cache.record_batch(len(prompts))
+            if self.speculative is not None:
+                self.speculative.record_batch(len(prompts))
+            tokens = [self.tokenizer.encode(prompt) for prompt in prompts]
+            response = mlx_lm.batch_generate(
+                self.model, self.tokenizer, tokens,
+                max_tokens=max_tokens,  # per-prompt limits
+                verbose=False,
+            )
+            return list(response.texts)
+
+        # Older mlx-lm without batch_generate: generate one at a time
+        return super().batch_generate(prompts, max_tokens)
+
+    def peak_memory(self) -> Optional[int]:
+        if self.model is None:
+            return None
+        import mlx.core as mx
+
+        # Moved out of mx.metal in newer MLX releases
+        get_peak_memory = getattr(mx, "get_peak_memory", None) or mx.metal.get_peak_memory
+        return int(get_peak_memory())
+
+    def stats(self) -> dict:
+        return {
+            "prefix_cache": self.prefix_cache.stats() if self.prefix_cache else None,
+            "speculative": self.speculative.stats() if self.speculative else None,
+        }
+
+
+# ── llama.cpp (CPU) ───────────────────────────────────────────────────────────
+
+
+class LlamaCppBackend(Backend):
+    """GGUF model on CPU through llama-cpp-python.
+
+    LoRA adapters must be fused into the GGUF file beforehand; llama.cpp
+    keeps the KV cache of the previous prompt and reuses its common
+    prefix on its own.
+    """
+
+    name = "llamacpp"
+    # One llama.cpp context: a paused stream's KV cache would be overwritten
+    interleaved_streams = False
+
+    def __init__(self, gguf_path: str = GGUF_PATH, n_threads: Optional[int] = None):
+        super().__init__()
+        self.gguf_path = os.getenv("ML_GGUF_PATH", gguf_path)
+        self.n_threads = n_threads or int(os.getenv("ML_CPU_THREADS", os.cpu_count() or 4))
+        self.llm = None
+
+    def load(self, model_name: str, adapter_path: Optional[str] = None) -> None:
+        from llama_cpp import Llama
+
+        path = Path(self.gguf_path)
+        if not path.exists():
+            raise FileNotFoundError(f"GGUF model not found: {path}")
+        # Weights are memory-mapped read-only, so worker processes
+        # (worker_pool.py) share one copy in the page cache
+        self.llm = Llama(
+            model_path=str(path),
+            n_ctx=MAX_SEQ_LENGTH,
+            n_threads=self.n_threads,
+            use_mmap=True,
+            verbose=False,
+        )
+        self.identity = _file_identity(path)
+
+    def load_tokenizer(self, model_name: str, adapter_path: Optional[str] = None) -> None:
+        from llama_cpp import Llama
+
+        path = Path(self.gguf_path)
+        self.llm = Llama(model_path=str(path), vocab_only=True, verbose=False)
+        self.identity = _file_identity(path)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.llm.tokenize(text.encode(), add_bos=False, special=True))
+
+    def generate(self, prompt: str, max_tokens: int) -> str:
+        output = self.llm(prompt, max_tokens=max_tokens, echo=False)
+        return output["choices"][0]["text"]
+
+    def stream(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        for chunk in self.llm(prompt, max_tokens=max_tokens, echo=False, stream=True):
+            yield chunk["choices"][0]["text"]
+
+
+# ── Fake ──────────────────────────────────────────────────────────────────────
+
+
+class FakeBackend(Backend):
+    """Deterministic stand-in: same prompt, same output, no model needed.
+
+    ``ML_FAKE_TOKEN_MS`` adds a per-token delay to mimic decoding speed
+    in load tests.
+    """
+
+    name = "fake"
+    _TOKEN = re.compile(r"\w+|[^\w\s]")
+    _WORDS = (
+        "обновления", "коммиты", "репозиторий", "ошибка", "сборка", "вопрос",
+        "ответ", "исправление", "задача", "ревью", "ветка", "релиз",
+    )
+
+    def __init__(self, token_ms: Optional[float] = None):
+        super().__init__()
+        if token_ms is None:
+            token_ms = float(os.getenv("ML_FAKE_TOKEN_MS", "0"))
+        self.token_delay = token_ms / 1000
+
+    def load(self, model_name: str, adapter_path: Optional[str] = None) -> None:
+        self.identity = "fake"
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._TOKEN.findall(text))
+
+    def stream(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        digest = hashlib.sha256(prompt.encode()).digest()
+        length = min(max_tokens, 8 + digest[0] % 24)
+        for i in range(length):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            word = self._WORDS[digest[i % len(digest)] % len(self._WORDS)]
+            yield word if i == 0 else f" {word}"
+
+    def generate(self, prompt: str, max_tokens: int) -> str:
+        return "".join(self.stream(prompt, max_tokens))
+
+
+BACKENDS = {
+    MLXBackend.name: MLXBackend,
+    LlamaCppBackend.name: LlamaCppBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def get_backend(name: Optional[str] = None) -> Backend:
+    """Backend instance by name (default: ``ML_BACKEND`` or ``config.BACKEND``)."""
+    name = name or os.getenv("ML_BACKEND", BACKEND)
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {sorted(BACKENDS)}")
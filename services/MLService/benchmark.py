@@ -0,0 +1,135 @@
+"""
+Backend benchmark.
+
+Runs the same summarize workload against any inference backend (see
+backends.py) and reports load time, single-request latency, streaming
+time-to-first-token, output tokens/s and batched throughput.
+"""
+
+import json
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backends import get_backend
+from config import ADAPTER_DIR, MAX_TOKENS, MODEL_NAME, OUTPUT_DIR
+from server import _build_prompt
+
+_SERVICES = [
+    ("github", "commit", "New commit in octo/api"),
+    ("github", "pull_request", "PR #{n} opened in octo/web"),
+    ("github", "issue", "Issue #{n}: crash on startup"),
+    ("github", "actions", "Workflow CI failed on main"),
+    ("stackoverflow", "new_answer", "New answer to question {n}"),
+]
+
+
+def sample_requests(count: int, seed: int = 0) -> list[list[str]]:
+    """Deterministic notification lists of varying length (3–30 items)."""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        items = []
+        for _ in range(rng.randint(3, 30)):
+            service, notif_type, title = rng.choice(_SERVICES)
+            n = rng.randint(1, 999)
+            items.append(
+                f"[{service}/{notif_type}] {title.format(n=n)}: "
+                f"update number {n} with some details about the change"
+            )
+        requests.append(items)
+    return requests
+
+
+def _percentiles(values: list[float]) -> dict:
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)) * 1000, 1),
+        "p95_ms": round(float(np.percentile(values, 95)) * 1000, 1),
+    }
+
+
+def run_benchmark(
+    backend_name: str | None = None,
+    model_name: str = MODEL_NAME,
+    adapter_path: str | None = ADAPTER_DIR,
+    requests: int = 16,
+    batch_size: int = 8,
+    max_tokens: int = MAX_TOKENS,
+    output_dir: str = OUTPUT_DIR,
+) -> dict:
+    """Benchmark a backend and save the results to ``benchmark_<backend>.json``."""
+    backend = get_backend(backend_name)
+    if adapter_path and not Path(adapter_path).exists():
+        adapter_path = None
+
+    print(f"\n{'=' * 60}")
+    print("  Backend Benchmark")
+    print(f"{'=' * 60}")
+    print(f"  Backend:  {backend.name}")
+    print(f"  Model:    {model_name}")
+    print(f"  Requests: {requests} (batch size {batch_size})")
+    print(f"{'=' * 60}\n")
+
+    started = time.perf_counter()
+    backend.load(model_name, adapter_path=adapter_path)
+    load_seconds = time.perf_counter() - started
+
+    prompts = [_build_prompt(items) for items in sample_requests(requests)]
+    prompt_tokens = [backend.count_tokens(prompt) for prompt in prompts]
+
+    # ── Sequential generate ──────────────────────────────────────────────
+    latencies, output_tokens = [], 0
+    for prompt in prompts:
+        started = time.perf_counter()
+        output = backend.generate(prompt, max_tokens)
+        latencies.append(time.perf_counter() - started)
+        output_tokens += backend.count_tokens(output)
+
+    # ── Streaming time-to-first-token ────────────────────────────────────
+    ttfts = []
+    for prompt in prompts:
+        started = time.perf_counter()
+        stream = backend.stream(prompt, max_tokens)
+        next(stream, None)
+        ttfts.append(time.perf_counter() - started)
+        stream.close()
+
+    # ── Batched throughput ───────────────────────────────────────────────
+    started = time.perf_counter()
+    for i in range(0, len(prompts), batch_size):
+        chunk = prompts[i:i + batch_size]
+        backend.batch_generate(chunk, [max_tokens] * len(chunk))
+    batch_seconds = time.perf_counter() - started
+
+    results = {
+        "backend": backend.name,
+        "model_id": backend.identity,
+        "requests": requests,
+        "load_s": round(load_seconds, 2),
+        "avg_prompt_tokens": round(float(np.mean(prompt_tokens)), 1),
+        "latency": _percentiles(latencies),
+        "ttft": _percentiles(ttfts),
+        "output_tokens_per_s": round(output_tokens / sum(latencies), 1) if sum(latencies) else 0.0,
+        "batch_size": batch_size,
+        "batch_requests_per_s": round(requests / batch_seconds, 2) if batch_seconds else 0.0,
+    }
+
+    print(f"{'=' * 60}")
+    print("  RESULTS")
+    print(f"{'=' * 60}")
+    print(f"  Load time:        {results['load_s']:.2f} s")
+    print(f"  Prompt tokens:    {results['avg_prompt_tokens']:.0f} avg")
+    print(f"  Latency:          p50 {results['latency']['p50_ms']} ms, p95 {results['latency']['p95_ms']} ms")
+    print(f"  TTFT (stream):    p50 {results['ttft']['p50_ms']} ms, p95 {results['ttft']['p95_ms']} ms")
+    print(f"  Output tokens/s:  {results['output_tokens_per_s']}")
+    print(f"  Batched:          {results['batch_requests_per_s']} req/s")
+    print(f"{'=' * 60}")
+
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    with open(out / f"benchmark_{backend.name}.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {out}/benchmark_{backend.name}.json")
+    return results
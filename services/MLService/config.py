@@ -26,3 +26,51 @@ EVAL_SAMPLES = 20
 MAX_TOKENS = 100
 TEMPERATURE = 0.7
 TOP_P = 0.9
+
+# Inference backend (backends.py): "mlx", "llamacpp" (CPU, GGUF) or "fake"
+BACKEND = "mlx"
+GGUF_PATH = "results/model.gguf"
+
+# Speculative decoding (MLX backend): a small model with the same tokenizer,
+# e.g. "mlx-community/gemma-3-1b-it-4bit"; None disables it. Speculation
+# pauses for SPECULATIVE_RETRY_AFTER requests when the draft acceptance rate
+# over the last SPECULATIVE_WINDOW proposed tokens drops below the minimum;
+# every SPECULATIVE_PROBE_EVERY-th request runs without the draft to measure
+# the speed-up.
+DRAFT_MODEL = None
+NUM_DRAFT_TOKENS = 3
+SPECULATIVE_MIN_ACCEPTANCE = 0.4
+SPECULATIVE_WINDOW = 300
+SPECULATIVE_RETRY_AFTER = 50
+SPECULATIVE_PROBE_EVERY = 10
+
+# Preconverted model from `python main.py prepare` (prepare.py): adapters
+# fused in, optionally quantized; the server loads it when it is up to date
+PREPARED_DIR = "results/prepared"
+
+# Serving: dynamic batching in server.py; WORKERS > 1 runs the model in
+# that many processes (worker_pool.py)
+WORKERS = 1
+MAX_BATCH_SIZE = 8
+MAX_BATCH_WAIT_MS = 20
+# Admission control (admission.py): requests allowed to wait for a slot,
+# and the share of that waiting room batch (Airflow) traffic may take
+MAX_QUEUE = 64
+BATCH_QUEUE_SHARE = 0.5
+# Extractive summarizer (extractive.py): answers requests with at most
+# EXTRACTIVE_MAX_NOTIFICATIONS notifications, and, with EXTRACTIVE_FALLBACK,
+# interactive requests the full queue would reject and requests that come
+# while the model is not loaded
+EXTRACTIVE_MAX_NOTIFICATIONS = 3
+EXTRACTIVE_FALLBACK = True
+# Hierarchical summarization (server.py): a list that doesn't fit one prompt
+# even after collapsing repeats is split into prompt-sized chunks, summarized
+# in parallel, and the partial summaries are summarized again; at most
+# HIERARCHICAL_MAX_CHUNKS chunks (the newest) per request
+HIERARCHICAL = True
+HIERARCHICAL_MAX_CHUNKS = 16
+# Reuse the KV cache of the fixed instruction prefix (prefix_cache.py)
+PREFIX_CACHE = True
+# Summary result cache (result_cache.py): LRU entries and Redis TTL, seconds
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 86400
@@ -1,8 +1,9 @@
 """
 Evaluation of the fine-tuned model.
 
-Loads the base model + LoRA adapters via mlx-lm,
-generates summaries on the test set, and computes ROUGE metrics.
+Loads the base model + LoRA adapters through the configured backend
+(see backends.py), generates summaries on the test set, and computes
+ROUGE metrics.
 """
 
 import json
@@ -10,7 +11,6 @@ from pathlib import Path
 
 import numpy as np
 from datasets import load_dataset
-from mlx_lm import generate, load
 from rouge_score import rouge_scorer
 from tqdm import tqdm
 
@@ -22,6 +22,7 @@ from config import (
     MODEL_NAME,
     OUTPUT_DIR,
 )
+from backends import get_backend
 from data import format_prompt
 
 
@@ -31,6 +32,7 @@ def evaluate(
     num_samples: int = EVAL_SAMPLES,
     max_tokens: int = MAX_TOKENS,
     output_dir: str = OUTPUT_DIR,
+    backend_name: str | None = None,
 ) -> dict:
     """Evaluate the fine-tuned model on the test split and return metrics."""
 
@@ -43,8 +45,9 @@ def evaluate(
     print(f"{'=' * 60}\n")
 
     # ── Load model with LoRA adapters ────────────────────────────────────
-    print("Loading model + LoRA adapters …")
-    model, tokenizer = load(model_name, adapter_path=adapter_path)
+    backend = get_backend(backend_name)
+    print(f"Loading model + LoRA adapters ({backend.name}) …")
+    backend.load(model_name, adapter_path=adapter_path)
 
     # ── Load test data ───────────────────────────────────────────────────
     print("Loading test dataset …")
@@ -62,13 +65,7 @@ def evaluate(
 
     for item in tqdm(dataset, desc="Generating"):
         prompt = format_prompt(item["body"])
-        response = generate(
-            model,
-            tokenizer,
-            prompt=prompt,
-            max_tokens=max_tokens,
-            verbose=False,
-        )
+        response = backend.generate(prompt, max_tokens)
         predictions.append(response.strip())
         references.append(item["title"])
 
@@ -0,0 +1,166 @@
+"""
+Extractive summarizer: no model, a few hundred microseconds per request.
+
+Notifications (``"[service/type] title: message"``, newest first) are
+grouped by service and repository. Within each group they are scored by
+TF-IDF cosine similarity to the group centroid, so the most typical
+notification represents the group; higher-priority types (see
+prompt_packing.py) come first and near-duplicates are skipped. The
+result lists the groups with their counts and representative lines.
+
+The server uses it for tiny inputs, when the model queue is full and
+when the model is not available (see ``engine`` in the responses).
+"""
+
+import re
+
+import numpy as np
+
+from prompt_packing import DEFAULT_PRIORITY, PRIORITY_BY_TYPE
+
+# Groups and representative lines per group in the summary
+MAX_GROUPS = 6
+LINES_PER_GROUP = 2
+MAX_LINE_CHARS = 120
+# Only the newest notifications are scored; older ones are just counted
+MAX_SCORED = 500
+# Cosine similarity above which a line repeats an already chosen one
+DUPLICATE_SIMILARITY = 0.9
+
+_TAG = re.compile(r"^\[([^/\]]*)/([^\]]*)\]\s*")
+# CoreService starts GitHub messages with "📦 owner/repo", then author and
+# issue number lines that say nothing on their own
+_REPO_MARK = re.compile(r"📦\s*([\w.-]+/[\w.-]+)")
+_META_LINES = ("📦", "👤", "🔢")
+_REPO = re.compile(r"\b([A-Za-z][\w.-]*/[\w.-]+)")
+# Words without digits, so hashes and numbers don't count as terms
+_WORD = re.compile(r"\b[^\W\d_]{2,}\b")
+# Leading emoji and bullets of message lines
+_DECORATION = re.compile(r"^[^\w#@]+")
+
+SERVICE_LABELS = {"github": "GitHub", "stackoverflow": "Stack Overflow"}
+TYPE_LABELS = {
+    "auth": "авторизация",
+    "error": "ошибки",
+    "pull_request": "PR",
+    "issue": "issue",
+    "new_answer": "ответы",
+    "new_comment": "комментарии",
+    "commit": "коммиты",
+    "actions": "CI",
+    "branch": "ветки",
+}
+
+
+def _parse(text: str) -> tuple[str, str, str, str]:
+    """Service, type, repository (may be empty) and the readable line."""
+    match = _TAG.match(text)
+    service, notif_type = (match.group(1), match.group(2)) if match else ("", "")
+    body = text[match.end():] if match else text
+    # Titles may contain ": " themselves ("Issue #12: crash on startup")
+    title, sep, message = body.partition(": 📦")
+    if sep:
+        message = "📦" + message
+    else:
+        title, _, message = body.partition(": ")
+
+    repo = _REPO_MARK.search(message) or _REPO.search(title)
+    repo_name = repo.group(1) if repo else ""
+
+    # Title plus the first message line that is not repo/author/number metadata
+    detail = ""
+    for line in message.splitlines():
+        if line.startswith(_META_LINES):
+            continue
+        line = _DECORATION.sub("", line).strip()
+        if line:
+            detail = line
+            break
+    line = f"{title} — {detail}" if detail else title
+    if len(line) > MAX_LINE_CHARS:
+        line = line[:MAX_LINE_CHARS - 1].rstrip() + "…"
+    return service, notif_type, repo_name, line
+
+
+def _tfidf(texts: list[str]) -> np.ndarray:
+    """L2-normalised TF-IDF rows (sublinear term frequency)."""
+    vocab: dict[str, int] = {}
+    rows: list[int] = []
+    cols: list[int] = []
+    for i, text in enumerate(texts):
+        for word in _WORD.findall(text.lower()):
+            rows.append(i)
+            cols.append(vocab.setdefault(word, len(vocab)))
+
+    n, v = len(texts), max(len(vocab), 1)
+    flat = np.asarray(rows, dtype=np.int64) * v + np.asarray(cols, dtype=np.int64)
+    counts = np.bincount(flat, minlength=n * v).reshape(n, v).astype(np.float32)
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + n) / (1 + df)) + 1
+    x = np.log1p(counts) * idf
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return x / norms
+
+
+def _plural(count: int) -> str:
+    if count % 10 == 1 and count % 100 != 11:
+        return "уведомление"
+    if 2 <= count % 10 <= 4 and not 12 <= count % 100 <= 14:
+        return "уведомления"
+    return "уведомлений"
+
+
+def summarize_extractive(notifications: list[str]) -> str:
+    """Group, score and list the most representative notifications."""
+    parsed = [_parse(text) for text in notifications]
+
+    # (service, repo) -> indices, newest first
+    groups: dict[tuple[str, str], list[int]] = {}
+    for i, (service, _, repo, _) in enumerate(parsed):
+        groups.setdefault((service, repo), []).append(i)
+
+    scored = min(len(notifications), MAX_SCORED)
+    x = _tfidf([line for _, _, _, line in parsed[:scored]])
+    ranks = np.array([PRIORITY_BY_TYPE.get(t, DEFAULT_PRIORITY) for _, t, _, _ in parsed])
+
+    entries = []
+    for (service, repo), members in groups.items():
+        idx = np.array([i for i in members if i < scored], dtype=np.int64)
+        lines: list[str] = []
+        if len(idx):
+            vectors = x[idx]
+            centrality = vectors @ vectors.mean(axis=0)
+            # Priority first, then how typical the line is; ties go to the newest
+            order = np.lexsort((idx, -centrality, ranks[idx]))
+            chosen: list[int] = []
+            for k in order:
+                if chosen and float(np.max(vectors[chosen] @ vectors[k])) > DUPLICATE_SIMILARITY:
+                    continue
+                chosen.append(int(k))
+                lines.append(parsed[idx[k]][3])
+                if len(chosen) == LINES_PER_GROUP:
+                    break
+
+        types: dict[str, int] = {}
+        for i in members:
+            types[parsed[i][1]] = types.get(parsed[i][1], 0) + 1
+        entries.append((int(ranks[members].min()), -len(members), members[0], service, repo, types, lines))
+    entries.sort(key=lambda entry: entry[:3])
+
+    out = []
+    for _, _, _, service, repo, types, lines in entries[:MAX_GROUPS]:
+        count = sum(types.values())
+        name = " · ".join(part for part in (SERVICE_LABELS.get(service, service), repo) if part)
+        breakdown = ", ".join(
+            f"{TYPE_LABELS.get(t, t or 'прочее')} ×{n}"
+            for t, n in sorted(types.items(), key=lambda item: -item[1])
+        )
+        out.append(f"{name or 'Прочее'} — {count} {_plural(count)} ({breakdown})")
+        out.extend(f"  • {line}" for line in lines)
+
+    rest = entries[MAX_GROUPS:]
+    if rest:
+        count = sum(-entry[1] for entry in rest)
+        out.append(f"… и ещё {count} {_plural(count)} из других источников")
+    return "\n".join(out)
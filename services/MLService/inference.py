@@ -0,0 +1,266 @@
+"""
+Dynamic batching inference scheduler.
+
+The model runs in one dedicated worker thread. Requests are put on a queue
+from the event loop; the worker takes the first waiting request, keeps
+collecting more for up to ``max_wait_ms`` (or until ``max_batch_size``)
+and generates the whole batch in one call. Each request gets its answer
+through its own future, so the event loop — and ``/health`` — never block
+on generation. Streaming requests are decoded one piece at a time in
+between, so a long stream doesn't hold up batches or other streams.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from config import MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS
+
+logger = logging.getLogger(__name__)
+
+# generate_batch(prompts, max_tokens per prompt) -> one completion per prompt
+GenerateBatch = Callable[[list[str], list[int]], list[str]]
+# stream_generate(prompt, max_tokens) -> text pieces as they are decoded
+StreamGenerate = Callable[[str, int], Iterator[str]]
+
+_STOP = object()
+
+
+class _Job:
+    __slots__ = ("prompt", "max_tokens", "future", "loop", "enqueued_at")
+
+    def __init__(self, prompt: str, max_tokens: int, loop: asyncio.AbstractEventLoop):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.loop = loop
+        self.future: asyncio.Future = loop.create_future()
+        self.enqueued_at = time.perf_counter()
+
+
+class _StreamJob:
+    """A streaming request: pieces are pushed to ``queue``, ``None`` ends it."""
+
+    __slots__ = ("prompt", "max_tokens", "queue", "loop", "enqueued_at", "cancelled")
+
+    def __init__(self, prompt: str, max_tokens: int, loop: asyncio.AbstractEventLoop):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.enqueued_at = time.perf_counter()
+        # Set from the event loop, read by the worker between tokens
+        self.cancelled = False
+
+    def push(self, item) -> None:
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+
+def _resolve(future: asyncio.Future, result=None, error: Optional[BaseException] = None) -> None:
+    """Runs on the event loop: the client may have cancelled meanwhile."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class InferenceScheduler:
+    """Queues summarize requests and runs them in dynamic batches."""
+
+    def __init__(
+        self,
+        generate_batch: GenerateBatch,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_BATCH_WAIT_MS,
+        stream_generate: Optional[StreamGenerate] = None,
+        interleave_streams: bool = True,
+    ):
+        self.generate_batch = generate_batch
+        self.stream_generate = stream_generate
+        # Decode streams piece by piece between batches; off for backends
+        # with a single generation context (llama.cpp)
+        self.interleave_streams = interleave_streams
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # Streaming jobs met while collecting a batch, run right after it
+        self._streams: list[_StreamJob] = []
+        self.batches = 0
+        self.completed = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Inference worker started (max batch {self.max_batch_size}, "
+            f"max wait {self.max_wait * 1000:.0f} ms)"
+        )
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    async def submit(self, prompt: str, max_tokens: int) -> str:
+        """Queue one prompt and wait for its completion.
+
+        Cancelling the awaiting task (e.g. on client disconnect) drops the
+        job if its batch has not started yet.
+        """
+        job = _Job(prompt, max_tokens, asyncio.get_running_loop())
+        self._queue.put(job)
+        return await job.future
+
+    async def submit_stream(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """Queue one prompt and yield text pieces as the model decodes them.
+
+        Closing the iterator early (client went away) stops generation at
+        the next token.
+        """
+        if self.stream_generate is None:
+            raise RuntimeError("streaming is not supported by this scheduler")
+        job = _StreamJob(prompt, max_tokens, asyncio.get_running_loop())
+        self._queue.put(job)
+        try:
+            while True:
+                item = await job.queue.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            job.cancelled = True
+
+    # ── Worker thread ─────────────────────────────────────────────────────────
+
+    def _collect(self, block: bool = True) -> Optional[list[_Job]]:
+        """Next batch; streaming jobs met on the way go to ``_streams``.
+
+        With ``block=False`` (streams are decoding) it returns at once if
+        nothing is queued.
+        """
+        try:
+            first = self._queue.get(block=block)
+        except queue.Empty:
+            return []
+        if first is _STOP:
+            return None
+        if isinstance(first, _StreamJob):
+            self._streams.append(first)
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is _STOP:
+                self._queue.put(_STOP)
+                break
+            if isinstance(job, _StreamJob):
+                self._streams.append(job)
+                continue
+            batch.append(job)
+        return batch
+
+    def _run_stream(self, job: _StreamJob) -> None:
+        """Whole stream at once, for backends that can't interleave."""
+        if job.cancelled:
+            return
+        try:
+            for piece in self.stream_generate(job.prompt, job.max_tokens):
+                if job.cancelled:
+                    logger.info("Stream cancelled by client, generation stopped")
+                    break
+                job.push(piece)
+        except Exception as e:
+            logger.error(f"Stream generation failed: {e}", exc_info=True)
+            job.push(e)
+        job.push(None)
+        self.completed += 1
+
+    def _step_streams(self, active: list[tuple[_StreamJob, Iterator[str]]]) -> None:
+        """Advance every active stream by one piece and drop finished ones."""
+        for entry in list(active):
+            job, pieces = entry
+            done = job.cancelled
+            if done:
+                logger.info("Stream cancelled by client, generation stopped")
+            else:
+                try:
+                    piece = next(pieces, None)
+                except Exception as e:
+                    logger.error(f"Stream generation failed: {e}", exc_info=True)
+                    job.push(e)
+                    done = True
+                else:
+                    if piece is None:
+                        done = True
+                    else:
+                        job.push(piece)
+            if done:
+                pieces.close()
+                job.push(None)
+                active.remove(entry)
+                self.completed += 1
+
+    def _run(self) -> None:
+        # Streams decode one piece per turn of this loop, between batches,
+        # so a long stream holds up neither batches nor other streams
+        active: list[tuple[_StreamJob, Iterator[str]]] = []
+        while True:
+            batch = self._collect(block=not active)
+            if batch is None:
+                while active:
+                    self._step_streams(active)
+                return
+            while self._streams:
+                job = self._streams.pop(0)
+                if not self.interleave_streams:
+                    self._run_stream(job)
+                elif not job.cancelled:
+                    active.append((job, iter(self.stream_generate(job.prompt, job.max_tokens))))
+            # Skip jobs whose clients went away while queued
+            batch = [job for job in batch if not job.future.done()]
+            if batch:
+                self._run_batch(batch)
+            self._step_streams(active)
+
+    def _run_batch(self, batch: list[_Job]) -> None:
+        started = time.perf_counter()
+        try:
+            # Each job keeps its own limit, whatever it was batched with
+            results = self.generate_batch(
+                [job.prompt for job in batch], [job.max_tokens for job in batch],
+            )
+        except Exception as e:
+            logger.error(f"Batch generation failed: {e}", exc_info=True)
+            for job in batch:
+                job.loop.call_soon_threadsafe(_resolve, job.future, None, e)
+            return
+
+        self.batches += 1
+        self.completed += len(batch)
+        logger.debug(
+            f"Generated batch of {len(batch)} in {time.perf_counter() - started:.2f}s"
+        )
+        for job, result in zip(batch, results):
+            job.loop.call_soon_threadsafe(_resolve, job.future, result)
@@ -9,6 +9,11 @@ Usage:
     python main.py eval               # evaluate on test set
     python main.py infer              # interactive inference
     python main.py infer --text "…"   # one-shot inference
+    python main.py bench              # benchmark the inference backend
+    python main.py prepare --q-bits 4 # fuse adapters (+ quantize) for the server
+
+The inference backend (mlx, llamacpp, fake) is chosen with --backend
+or ML_BACKEND.
 """
 
 import argparse
@@ -62,23 +67,22 @@ def cmd_eval(args: argparse.Namespace) -> None:
         model_name=args.model,
         adapter_path=args.adapter_path,
         num_samples=args.num_samples,
+        backend_name=args.backend,
     )
 
 
 def cmd_infer(args: argparse.Namespace) -> None:
-    from mlx_lm import generate, load
+    from backends import get_backend
     from data import format_prompt
 
-    print(f"Loading {args.model} + adapters from {args.adapter_path} …")
-    model, tokenizer = load(args.model, adapter_path=args.adapter_path)
+    backend = get_backend(args.backend)
+    print(f"Loading {args.model} + adapters from {args.adapter_path} ({backend.name}) …")
+    backend.load(args.model, adapter_path=args.adapter_path)
 
     # One-shot mode
     if args.text:
         prompt = format_prompt(args.text)
-        response = generate(
-            model, tokenizer, prompt=prompt,
-            max_tokens=args.max_tokens, verbose=False,
-        )
+        response = backend.generate(prompt, args.max_tokens)
         print(f"\nSummary: {response.strip()}")
         return
 
@@ -91,16 +95,35 @@ def cmd_infer(args: argparse.Namespace) -> None:
             if not text:
                 continue
             prompt = format_prompt(text)
-            response = generate(
-                model, tokenizer, prompt=prompt,
-                max_tokens=args.max_tokens, verbose=False,
-            )
+            response = backend.generate(prompt, args.max_tokens)
             print(f"Summary: {response.strip()}\n")
         except (KeyboardInterrupt, EOFError):
             print("\nBye!")
             break
 
 
+def cmd_bench(args: argparse.Namespace) -> None:
+    from benchmark import run_benchmark
+    run_benchmark(
+        backend_name=args.backend,
+        model_name=args.model,
+        adapter_path=args.adapter_path,
+        requests=args.requests,
+        batch_size=args.batch_size,
+        max_tokens=args.max_tokens,
+    )
+
+
+def cmd_prepare(args: argparse.Namespace) -> None:
+    from prepare import prepare_model
+    prepare_model(
+        model_name=args.model,
+        adapter_path=args.adapter_path,
+        output_dir=args.output,
+        q_bits=args.q_bits,
+    )
+
+
 # ── CLI ──────────────────────────────────────────────────────────────────────
 
 def main() -> None:
@@ -128,6 +151,7 @@ def main() -> None:
     p_eval.add_argument("--model", default="google/gemma-3-4b-it")
     p_eval.add_argument("--adapter-path", default="results/adapters")
     p_eval.add_argument("--num-samples", type=int, default=20)
+    p_eval.add_argument("--backend", default=None, help="mlx, llamacpp or fake")
 
     # -- infer --
     p_infer = sub.add_parser("infer", help="Interactive inference")
@@ -136,6 +160,24 @@ def main() -> None:
     p_infer.add_argument("--max-tokens", type=int, default=100)
     p_infer.add_argument("--text", type=str, default=None,
                          help="Issue body to summarize (omit for interactive mode)")
+    p_infer.add_argument("--backend", default=None, help="mlx, llamacpp or fake")
+
+    # -- bench --
+    p_bench = sub.add_parser("bench", help="Benchmark an inference backend")
+    p_bench.add_argument("--backend", default=None, help="mlx, llamacpp or fake")
+    p_bench.add_argument("--model", default="google/gemma-3-4b-it")
+    p_bench.add_argument("--adapter-path", default="results/adapters")
+    p_bench.add_argument("--requests", type=int, default=16)
+    p_bench.add_argument("--batch-size", type=int, default=8)
+    p_bench.add_argument("--max-tokens", type=int, default=100)
+
+    # -- prepare --
+    p_prepare = sub.add_parser("prepare", help="Build the preconverted model the server loads")
+    p_prepare.add_argument("--model", default="google/gemma-3-4b-it")
+    p_prepare.add_argument("--adapter-path", default="results/adapters")
+    p_prepare.add_argument("--output", default="results/prepared")
+    p_prepare.add_argument("--q-bits", type=int, choices=[4, 8], default=None,
+                           help="Quantize the fused weights (default: keep precision)")
 
     args = parser.parse_args()
     if not args.command:
@@ -150,6 +192,8 @@ def main() -> None:
         "train": cmd_train,
         "eval": cmd_eval,
         "infer": cmd_infer,
+        "bench": cmd_bench,
+        "prepare": cmd_prepare,
     }
     dispatch[args.command](args)
 
@@ -0,0 +1,112 @@
+"""
+KV-cache reuse for the fixed instruction prefix of summarize prompts.
+
+Every prompt from server._build_prompt starts with the same instruction
+block. The prefix is prefilled once at startup and its KV cache is kept;
+each request gets a cache holding that prefix and only the per-request
+tokens (the notifications) are prefilled. Caches are handed back after
+generation, trimmed to the prefix and reused, so a copy of the prefix
+state is only made when every pooled cache is busy.
+"""
+
+import copy
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Spare caches kept for reuse; one per concurrently generating request
+MAX_POOLED = 8
+
+
+class PrefixCache:
+    """Prefilled KV cache of a shared prompt prefix."""
+
+    def __init__(self, model, tokenizer, prefix: str):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix = prefix
+        self.tokens: list[int] = tokenizer.encode(prefix)
+        self._cache = None
+        self._pool: list[list] = []
+        # Time it takes to prefill the prefix: what every hit saves
+        self.prefill_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.copies = 0
+        # Prompts of multi-prompt batches, prefilled in full without the cache
+        self.batched = 0
+
+    def build(self) -> None:
+        """Prefill the prefix once and keep the resulting KV cache."""
+        import mlx.core as mx
+        from mlx_lm.models.cache import make_prompt_cache
+
+        started = time.perf_counter()
+        cache = make_prompt_cache(self.model)
+        self.model(mx.array(self.tokens)[None], cache=cache)
+        mx.eval([c.state for c in cache])
+        self.prefill_seconds = time.perf_counter() - started
+        self._cache = cache
+        logger.info(
+            f"Prefix cache built: {len(self.tokens)} tokens "
+            f"prefilled in {self.prefill_seconds * 1000:.0f} ms"
+        )
+
+    def split(self, prompt: str) -> tuple[list[int], list | None]:
+        """Return ``(tokens_to_prefill, prompt_cache)`` for ``prompt``.
+
+        On a hit the prefix tokens are dropped and a private cache holding
+        the prefix state is returned; pass it to ``release`` when generation
+        is over. When the prompt does not start with
+        the prefix (or it tokenizes differently at the boundary) the full
+        token list is returned with no cache.
+        """
+        tokens = self.tokenizer.encode(prompt)
+        n = len(self.tokens)
+        if (
+            self._cache is None
+            or len(tokens) <= n
+            or tokens[:n] != self.tokens
+        ):
+            self.misses += 1
+            return tokens, None
+        self.hits += 1
+        if self._pool:
+            return tokens[n:], self._pool.pop()
+        self.copies += 1
+        return tokens[n:], copy.deepcopy(self._cache)
+
+    def release(self, cache: list) -> None:
+        """Trim a cache returned by ``split`` back to the prefix and pool it."""
+        from mlx_lm.models.cache import can_trim_prompt_cache, trim_prompt_cache
+
+        if len(self._pool) >= MAX_POOLED:
+            return
+        extra = cache[0].offset - len(self.tokens)
+        if extra > 0:
+            # Rotating (sliding-window) caches that wrapped cannot be trimmed
+            if not can_trim_prompt_cache(cache):
+                return
+            trim_prompt_cache(cache, extra)
+        self._pool.append(cache)
+
+    def record_batch(self, size: int) -> None:
+        """Count prompts that a batched call prefilled without the cache."""
+        self.batched += size
+
+    @property
+    def saved_seconds(self) -> float:
+        """Prefill time saved so far, estimated from the startup prefill."""
+        return self.hits * self.prefill_seconds
+
+    def stats(self) -> dict:
+        return {
+            "prefix_tokens": len(self.tokens),
+            "prefill_ms": round(self.prefill_seconds * 1000, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "copies": self.copies,
+            "batched_full_prefill": self.batched,
+            "saved_prefill_s": round(self.saved_seconds, 3),
+        }
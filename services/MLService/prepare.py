@@ -0,0 +1,134 @@
+"""
+Preconverted model artifact for fast server starts.
+
+``python main.py prepare`` fuses the LoRA adapters into the base model
+(``python -m mlx_lm fuse``), optionally quantizes the result
+(``python -m mlx_lm convert -q``) and writes it to ``PREPARED_DIR`` as
+MLX safetensors with a ``prepared.json`` manifest. The server then
+loads that local directory instead of resolving the hub model and
+applying adapters: MLX maps safetensors lazily, so start-up no longer
+re-downloads, re-fuses or re-quantizes anything.
+
+The manifest records which adapters were fused in; if the adapters are
+retrained later the artifact is considered stale and the server falls
+back to loading the base model with adapters until ``prepare`` is run
+again.
+"""
+
+import json
+import logging
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import ADAPTER_DIR, MODEL_NAME, PREPARED_DIR
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "prepared.json"
+
+
+def adapter_identity(adapter_path: Optional[str]) -> Optional[str]:
+    """Size and mtime of the adapter weights, to detect retraining."""
+    if adapter_path is None:
+        return None
+    weights = Path(adapter_path) / "adapters.safetensors"
+    if not weights.exists():
+        return None
+    stat = weights.stat()
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def read_manifest(prepared_dir: str) -> Optional[dict]:
+    path = Path(prepared_dir) / MANIFEST
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def prepared_source(
+    prepared_dir: str, model_name: str, adapter_path: Optional[str],
+) -> Optional[str]:
+    """``prepared_dir`` if it holds an up-to-date artifact of this model."""
+    manifest = read_manifest(prepared_dir)
+    if manifest is None:
+        return None
+    if manifest["model"] != model_name or manifest["adapters"] != adapter_identity(adapter_path):
+        logger.warning(
+            f"Prepared model in {prepared_dir} is stale "
+            f"(built from {manifest['model']} with other adapters), "
+            f"loading {model_name} instead; re-run `python main.py prepare`"
+        )
+        return None
+    return prepared_dir
+
+
+def _run(cmd: list[str]) -> None:
+    print(f"$ {' '.join(cmd)}\n")
+    subprocess.check_call(cmd)
+
+
+def prepare_model(
+    model_name: str = MODEL_NAME,
+    adapter_path: Optional[str] = ADAPTER_DIR,
+    output_dir: str = PREPARED_DIR,
+    q_bits: Optional[int] = None,
+) -> Path:
+    """Fuse adapters and optionally quantize into ``output_dir``."""
+    if adapter_path and not Path(adapter_path).exists():
+        adapter_path = None
+    output = Path(output_dir)
+
+    print(f"\n{'=' * 60}")
+    print("  Prepare model")
+    print(f"{'=' * 60}")
+    print(f"  Model:     {model_name}")
+    print(f"  Adapters:  {adapter_path or 'none'}")
+    print(f"  Quantize:  {f'{q_bits}-bit' if q_bits else 'no'}")
+    print(f"  Output:    {output}")
+    print(f"{'=' * 60}\n")
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=output.parent if output.parent.exists() else None) as tmp:
+        source = model_name
+        if adapter_path:
+            fused = Path(tmp) / "fused"
+            _run([
+                sys.executable, "-m", "mlx_lm", "fuse",
+                "--model", model_name,
+                "--adapter-path", adapter_path,
+                "--save-path", str(fused),
+            ])
+            source = str(fused)
+
+        # convert refuses to write into an existing directory
+        staged = Path(tmp) / "prepared"
+        cmd = [
+            sys.executable, "-m", "mlx_lm", "convert",
+            "--hf-path", source,
+            "--mlx-path", str(staged),
+        ]
+        if q_bits:
+            cmd += ["-q", "--q-bits", str(q_bits)]
+        _run(cmd)
+
+        with open(staged / MANIFEST, "w") as f:
+            json.dump({
+                "model": model_name,
+                "adapters": adapter_identity(adapter_path),
+                "q_bits": q_bits,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }, f, indent=2)
+
+        if output.exists():
+            shutil.rmtree(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(staged), output)
+
+    print(f"\n✅ Prepared model → {output} ({time.perf_counter() - started:.0f} s)")
+    return output
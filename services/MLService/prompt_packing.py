@@ -0,0 +1,141 @@
+"""
+Token-budget-aware packing of notifications into a summarize prompt.
+
+Notifications arrive as ``"[service/type] title: message"`` lines, newest
+first. Near-identical ones (differing only in numbers or hashes, or for
+commits/CI runs coming from the same repository) are collapsed into one
+line with a count, then lines are added by priority and recency until the
+token budget is spent. Lists too long for one prompt can instead be split
+into budget-sized chunks for hierarchical summarization.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+SEPARATOR = "\n---\n"
+
+# Same priorities as BotService delivery lanes: lower rank is kept first
+PRIORITY_BY_TYPE = {
+    "auth": 0,
+    "error": 0,
+    "pull_request": 1,
+    "issue": 1,
+    "new_answer": 1,
+    "new_comment": 1,
+    "commit": 2,
+    "actions": 2,
+    "branch": 2,
+}
+DEFAULT_PRIORITY = 1
+LOW_PRIORITY = 2
+
+_TAG = re.compile(r"^\[([^/\]]*)/([^\]]*)\]\s*")
+# Commit SHAs, ids and counters don't make two notifications different
+_VOLATILE = re.compile(r"\b[0-9a-f]{7,40}\b|\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class PackResult:
+    notifications: list[str]
+    input_tokens: int
+    packed_tokens: int
+    collapsed: int = 0
+    dropped: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.input_tokens - self.packed_tokens
+
+
+def _shape(text: str) -> tuple[str, str]:
+    """Group key for near-duplicates and the notification type.
+
+    Low-priority bulk types (commits, CI runs) are grouped by title, i.e.
+    per repository; everything else only when the whole text matches
+    up to numbers and hashes.
+    """
+    match = _TAG.match(text)
+    notif_type = match.group(2) if match else ""
+    if PRIORITY_BY_TYPE.get(notif_type, DEFAULT_PRIORITY) == LOW_PRIORITY:
+        text = text.split(": ", 1)[0]
+    return _WHITESPACE.sub(" ", _VOLATILE.sub("#", text.lower())).strip(), notif_type
+
+
+def pack_notifications(
+    notifications: list[str],
+    count_tokens: Callable[[str], int],
+    budget: int,
+) -> PackResult:
+    """Collapse near-duplicates and fit ``notifications`` into ``budget`` tokens.
+
+    ``notifications`` must be newest first; the packed list keeps that order.
+    The highest-priority line is always kept, even if it alone is over budget.
+    """
+    # shape -> [index of newest member, number of members]
+    groups: dict[str, list[int]] = {}
+    types: dict[str, str] = {}
+    for i, text in enumerate(notifications):
+        key, notif_type = _shape(text)
+        group = groups.setdefault(key, [i, 0])
+        group[1] += 1
+        types[key] = notif_type
+
+    separator_tokens = count_tokens(SEPARATOR)
+    input_tokens = sum(count_tokens(text) for text in notifications)
+    input_tokens += separator_tokens * max(len(notifications) - 1, 0)
+
+    candidates = []
+    for key, (index, count) in groups.items():
+        line = notifications[index]
+        if count > 1:
+            line = f"{line} (×{count})"
+        rank = PRIORITY_BY_TYPE.get(types[key], DEFAULT_PRIORITY)
+        candidates.append((rank, index, line))
+    candidates.sort()
+
+    chosen: list[tuple[int, str]] = []
+    used = 0
+    for _, index, line in candidates:
+        cost = count_tokens(line) + (separator_tokens if chosen else 0)
+        if chosen and used + cost > budget:
+            continue
+        chosen.append((index, line))
+        used += cost
+    chosen.sort()
+
+    return PackResult(
+        notifications=[line for _, line in chosen],
+        input_tokens=input_tokens,
+        packed_tokens=used,
+        collapsed=len(notifications) - len(groups),
+        dropped=len(groups) - len(chosen),
+    )
+
+
+def split_by_budget(
+    lines: list[str],
+    count_tokens: Callable[[str], int],
+    budget: int,
+) -> list[list[str]]:
+    """Split newest-first ``lines`` into consecutive chunks of at most ``budget`` tokens.
+
+    Chunks keep the order of ``lines`` (newest chunk first) and are cut
+    from the oldest end, so only the newest chunk may be short. A line
+    over budget gets a chunk of its own.
+    """
+    separator_tokens = count_tokens(SEPARATOR)
+    chunks: list[list[str]] = []
+    current: list[str] = []
+    used = 0
+    for line in reversed(lines):
+        cost = count_tokens(line)
+        if current and used + separator_tokens + cost > budget:
+            chunks.append(current[::-1])
+            current, used = [], 0
+        used += cost + (separator_tokens if current else 0)
+        current.append(line)
+    if current:
+        chunks.append(current[::-1])
+    return chunks[::-1]
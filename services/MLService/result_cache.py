@@ -0,0 +1,172 @@
+"""
+Content-addressed cache of summarize results.
+
+Results are keyed by a hash of the normalized notifications, ``max_tokens``
+and the model/adapter identity, kept in an in-process LRU and, when a Redis
+URL is configured, in Redis so they survive restarts and are shared between
+replicas. Concurrent identical requests share one generation.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def cache_key(notifications: list[str], max_tokens: int, model_id: str) -> str:
+    """Stable key for a summarize request; whitespace differences are ignored."""
+    normalized = [_WHITESPACE.sub(" ", text).strip() for text in notifications]
+    payload = json.dumps(
+        {"n": normalized, "t": max_tokens, "m": model_id},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """LRU (+ optional Redis) cache with single-flight generation."""
+
+    def __init__(self, max_entries: int = 256, redis_url: str = "", ttl: int = 86400):
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self.ttl = ttl
+        # key -> (summary, seconds it took to generate)
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._redis = None
+        # key -> [shared generation task, number of waiting requests]
+        self._inflight: dict[str, list] = {}
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+
+    async def connect(self) -> None:
+        if not self.redis_url:
+            return
+        try:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=5,
+            )
+            await self._redis.ping()
+            logger.info("Result cache: Redis connected")
+        except ImportError:
+            logger.warning("redis package not installed, Redis result cache disabled")
+            self._redis = None
+        except Exception as e:
+            logger.warning(f"Redis connection failed, Redis result cache disabled: {e}")
+            self._redis = None
+
+    async def close(self) -> None:
+        if self._redis:
+            await self._redis.close()
+
+    # ── Storage ───────────────────────────────────────────────────────────────
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[1]
+            return entry[0]
+
+        if self._redis:
+            try:
+                raw = await self._redis.get(f"ml:summary:{key}")
+            except Exception as e:
+                logger.warning(f"Redis GET error: {e}")
+                raw = None
+            if raw:
+                data = json.loads(raw)
+                self._remember(key, data["summary"], data["cost"])
+                self.hits += 1
+                self.redis_hits += 1
+                self.saved_seconds += data["cost"]
+                return data["summary"]
+        return None
+
+    async def set(self, key: str, summary: str, cost: float) -> None:
+        self._remember(key, summary, cost)
+        if self._redis:
+            try:
+                await self._redis.set(
+                    f"ml:summary:{key}",
+                    json.dumps({"summary": summary, "cost": cost}, ensure_ascii=False),
+                    ex=self.ttl,
+                )
+            except Exception as e:
+                logger.warning(f"Redis SET error: {e}")
+
+    def _remember(self, key: str, summary: str, cost: float) -> None:
+        self._entries[key] = (summary, cost)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ── Single-flight ─────────────────────────────────────────────────────────
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Return the cached summary or generate it once for all concurrent callers.
+
+        Cancelling a caller only cancels the generation when no other caller
+        is waiting for it.
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        flight = self._inflight.get(key)
+        joined = flight is not None
+        if joined:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            flight = [asyncio.ensure_future(self._compute(key, compute)), 0]
+            self._inflight[key] = flight
+            flight[0].add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        flight[1] += 1
+        try:
+            summary = await asyncio.shield(flight[0])
+            if joined and key in self._entries:
+                self.saved_seconds += self._entries[key][1]
+            return summary
+        except asyncio.CancelledError:
+            if flight[1] == 1:
+                flight[0].cancel()
+            raise
+        finally:
+            flight[1] -= 1
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        started = time.perf_counter()
+        summary = await compute()
+        await self.set(key, summary, time.perf_counter() - started)
+        return summary
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "redis": self._redis is not None,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
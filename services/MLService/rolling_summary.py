@@ -0,0 +1,132 @@
+"""
+Storage for rolling (incrementally updated) summaries.
+
+A rolling summary is identified by a caller-chosen id (e.g. ``user:42``)
+and holds the latest summary text plus the watermark of the newest
+notification folded into it. Kept in an in-process LRU and, when a Redis
+URL is configured, in Redis.
+"""
+
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RollingSummary:
+    summary: str
+    # Opaque marker of the newest notification included (id, timestamp …)
+    watermark: Optional[str] = None
+    # How many notifications have been folded in so far
+    notifications: int = 0
+
+
+class SummaryStore:
+    """Rolling summaries by id: LRU in memory + optional Redis."""
+
+    def __init__(self, max_entries: int = 1024, redis_url: str = "", ttl: int = 7 * 86400):
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self._entries: OrderedDict[str, RollingSummary] = OrderedDict()
+        self._redis = None
+
+    async def connect(self) -> None:
+        if not self.redis_url:
+            return
+        try:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=5,
+            )
+            await self._redis.ping()
+            logger.info("Summary store: Redis connected")
+        except ImportError:
+            logger.warning("redis package not installed, rolling summaries kept in memory only")
+            self._redis = None
+        except Exception as e:
+            logger.warning(f"Redis connection failed, rolling summaries kept in memory only: {e}")
+            self._redis = None
+
+    async def close(self) -> None:
+        if self._redis:
+            await self._redis.close()
+
+    async def get(self, summary_id: str) -> Optional[RollingSummary]:
+        entry = self._entries.get(summary_id)
+        if entry is not None:
+            self._entries.move_to_end(summary_id)
+            return entry
+        if self._redis:
+            try:
+                raw = await self._redis.get(f"ml:rolling:{summary_id}")
+            except Exception as e:
+                logger.warning(f"Redis GET error: {e}")
+                raw = None
+            if raw:
+                entry = RollingSummary(**json.loads(raw))
+                self._remember(summary_id, entry)
+                return entry
+        return None
+
+    async def put(self, summary_id: str, entry: RollingSummary) -> None:
+        self._remember(summary_id, entry)
+        if self._redis:
+            try:
+                await self._redis.set(
+                    f"ml:rolling:{summary_id}",
+                    json.dumps(asdict(entry), ensure_ascii=False),
+                    ex=self.ttl,
+                )
+            except Exception as e:
+                logger.warning(f"Redis SET error: {e}")
+
+    async def replace(
+        self, summary_id: str, expected: Optional[RollingSummary], entry: RollingSummary,
+    ) -> bool:
+        """Store ``entry`` only if the stored summary is still ``expected``.
+
+        Compare-and-set for concurrent updates: returns False (nothing
+        written) when another update got there first. With Redis the
+        check and the write run in one WATCH/MULTI transaction.
+        """
+        if self._redis:
+            from redis.exceptions import WatchError
+
+            key = f"ml:rolling:{summary_id}"
+            try:
+                async with self._redis.pipeline(transaction=True) as pipe:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    current = RollingSummary(**json.loads(raw)) if raw else None
+                    if current != expected:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.set(key, json.dumps(asdict(entry), ensure_ascii=False), ex=self.ttl)
+                    await pipe.execute()
+            except WatchError:
+                return False
+            except Exception as e:
+                logger.warning(f"Redis compare-and-set error: {e}")
+            else:
+                self._remember(summary_id, entry)
+                return True
+
+        # No await between the check and the write: atomic within the event loop
+        if self._entries.get(summary_id) != expected:
+            return False
+        self._remember(summary_id, entry)
+        return True
+
+    def _remember(self, summary_id: str, entry: RollingSummary) -> None:
+        self._entries[summary_id] = entry
+        self._entries.move_to_end(summary_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -2,32 +2,98 @@
 FastAPI server for MLService.
 
 Exposes a /summarize endpoint that takes a list of notification texts
-and returns a concise summary using the fine-tuned LoRA model.
+and returns a concise summary using the fine-tuned LoRA model (through
+the backend selected in backends.py). Generation runs in a dedicated
+worker thread with dynamic batching (see inference.py), so the event
+loop stays responsive.
 """
 
+import asyncio
+import json
 import logging
+import math
 import os
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Awaitable, Callable
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-
-from config import ADAPTER_DIR, MAX_TOKENS, MODEL_NAME
+from starlette.background import BackgroundTask
+
+from admission import (
+    BATCH,
+    INTERACTIVE,
+    PRIORITIES,
+    AdmissionController,
+    DeadlineExceeded,
+    Overloaded,
+)
+from backends import Backend, get_backend
+from config import (
+    ADAPTER_DIR,
+    BATCH_QUEUE_SHARE,
+    EXTRACTIVE_FALLBACK,
+    EXTRACTIVE_MAX_NOTIFICATIONS,
+    HIERARCHICAL,
+    HIERARCHICAL_MAX_CHUNKS,
+    MAX_BATCH_SIZE,
+    MAX_BATCH_WAIT_MS,
+    MAX_QUEUE,
+    MAX_SEQ_LENGTH,
+    MAX_TOKENS,
+    MODEL_NAME,
+    PREFIX_CACHE,
+    PREPARED_DIR,
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_TTL,
+    WORKERS,
+)
+from extractive import summarize_extractive
+from inference import InferenceScheduler
+from prepare import prepared_source
+from prompt_packing import SEPARATOR, pack_notifications, split_by_budget
+from result_cache import ResultCache, cache_key
+from rolling_summary import RollingSummary, SummaryStore
+from telemetry import RequestMetricsMiddleware, ServiceMetrics, peak_rss_bytes
+from worker_pool import WorkerPool
 
 logger = logging.getLogger(__name__)
 
-# ── Global model state ────────────────────────────────────────────────────────
+# How often a waiting request checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.25
 
-_model = None
-_tokenizer = None
+# Fixed instruction block every summarize prompt starts with
+PROMPT_PREFIX = (
+    "<start_of_turn>user\n"
+    "Summarize the following list of notifications "
+    "into a brief overview in Russian. "
+    "Group by topic if possible. Be concise.\n\n"
+)
 
+# Tokens generated by the warm-up request, so the first real request
+# doesn't pay for lazy weight loading and kernel compilation
+WARMUP_TOKENS = 8
 
-def _load_model():
-    """Load the base model + LoRA adapters once at startup."""
-    global _model, _tokenizer
-    from mlx_lm import load
+# ── Global model state ────────────────────────────────────────────────────────
 
+_backend: Backend | None = None
+# In-process scheduler, or a pool of model worker processes (ML_WORKERS > 1)
+_scheduler: InferenceScheduler | WorkerPool | None = None
+_admission: AdmissionController | None = None
+_result_cache: ResultCache | None = None
+_summary_store: SummaryStore | None = None
+# Cumulative prompt packing counters, reported on /metrics
+_packing = {"requests": 0, "input_tokens": 0, "packed_tokens": 0, "collapsed": 0, "dropped": 0}
+_metrics = ServiceMetrics()
+# Start-up progress, reported on /ready and /health
+_startup = {"state": "loading", "source": None, "load_s": None, "warmup_s": None, "error": None}
+
+
+def _model_source() -> tuple[str, str | None]:
+    """Model name and adapter path (None when there are no adapters yet)."""
     model_name = os.getenv("ML_MODEL_NAME", MODEL_NAME)
     adapter_path = os.getenv("ML_ADAPTER_PATH", ADAPTER_DIR)
 
@@ -36,18 +102,136 @@ def _load_model():
             f"Adapter path {adapter_path} not found, loading base model only"
         )
         adapter_path = None
+    return model_name, adapter_path
+
+
+def _prefix_enabled() -> bool:
+    return os.getenv("ML_PREFIX_CACHE", str(PREFIX_CACHE)).lower() in ("1", "true", "yes")
 
-    logger.info(f"Loading model {model_name} (adapters: {adapter_path}) …")
-    _model, _tokenizer = load(model_name, adapter_path=adapter_path)
-    logger.info("Model loaded successfully")
+
+def _load_source(model_name: str, adapter_path: str | None) -> tuple[str, str | None]:
+    """The prepared model (adapters fused in) if it is up to date, else the originals."""
+    prepared = prepared_source(os.getenv("ML_PREPARED_PATH", PREPARED_DIR), model_name, adapter_path)
+    if prepared is not None:
+        return prepared, None
+    return model_name, adapter_path
+
+
+def _load_model():
+    """Load the base model + LoRA adapters (or the prepared model) once at startup."""
+    global _backend
+    backend = get_backend()
+    model_name, adapter_path = _model_source()
+    source, source_adapters = _load_source(model_name, adapter_path)
+    _startup["source"] = source
+
+    logger.info(f"Loading model {source} (backend: {backend.name}, adapters: {source_adapters}) …")
+    backend.load(source, adapter_path=source_adapters)
+    if _prefix_enabled():
+        backend.set_prompt_prefix(PROMPT_PREFIX)
+    _backend = backend
+    _metrics.set_labels(backend.name, adapter_path)
+
+
+def _start_workers(
+    workers: int, max_batch_size: int, max_wait_ms: float, loop: asyncio.AbstractEventLoop,
+) -> WorkerPool:
+    """Run the model in worker processes; this process only keeps the tokenizer."""
+    global _backend
+    backend = get_backend()
+    model_name, adapter_path = _model_source()
+    source, source_adapters = _load_source(model_name, adapter_path)
+    _startup["source"] = source
+
+    logger.info(f"Starting {workers} model workers for {source} (backend: {backend.name}) …")
+    backend.load_tokenizer(source, adapter_path=source_adapters)
+    pool = WorkerPool(
+        workers,
+        backend.name,
+        source,
+        source_adapters,
+        prompt_prefix=PROMPT_PREFIX if _prefix_enabled() else None,
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+    )
+    pool.start(loop)
+    _backend = backend
+    _metrics.set_labels(backend.name, adapter_path)
+    return pool
+
+
+async def _start_model(workers: int, max_batch_size: int, max_wait_ms: float) -> None:
+    """Load and warm up the model, then open the summarize endpoints.
+
+    Runs in the background so /health and /ready answer while loading.
+    """
+    global _scheduler
+    started = time.perf_counter()
+    scheduler = None
+    try:
+        if workers > 1:
+            scheduler = await asyncio.to_thread(
+                _start_workers, workers, max_batch_size, max_wait_ms, asyncio.get_running_loop(),
+            )
+        else:
+            await asyncio.to_thread(_load_model)
+            scheduler = InferenceScheduler(
+                _backend.batch_generate, max_batch_size, max_wait_ms,
+                stream_generate=_backend.stream, interleave_streams=_backend.interleaved_streams,
+            )
+            scheduler.start()
+        _startup["load_s"] = round(time.perf_counter() - started, 2)
+
+        # One request per worker; least-loaded routing spreads them out
+        warmup_started = time.perf_counter()
+        prompt = _build_prompt(["[github/commit] New commit in octo/api"])
+        await asyncio.gather(*(
+            scheduler.submit(prompt, WARMUP_TOKENS) for _ in range(max(workers, 1))
+        ))
+        _startup["warmup_s"] = round(time.perf_counter() - warmup_started, 2)
+    except Exception as e:
+        logger.error(f"Model failed to load: {e}", exc_info=True)
+        _startup.update(state="failed", error=str(e))
+        if scheduler is not None:
+            await asyncio.to_thread(scheduler.stop)
+        return
+
+    _scheduler = scheduler
+    _startup["state"] = "ready"
+    logger.info(
+        f"MLService ready: load {_startup['load_s']:.1f} s, warm-up {_startup['warmup_s']:.1f} s"
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load the model on startup, release on shutdown."""
-    _load_model()
+    """Start loading the model and set up the caches; release on shutdown."""
+    global _admission, _result_cache, _summary_store
+    max_batch_size = int(os.getenv("ML_MAX_BATCH_SIZE", MAX_BATCH_SIZE))
+    max_wait_ms = float(os.getenv("ML_MAX_BATCH_WAIT_MS", MAX_BATCH_WAIT_MS))
+    workers = int(os.getenv("ML_WORKERS", WORKERS))
+    loader = asyncio.create_task(_start_model(workers, max_batch_size, max_wait_ms))
+    # Enough in flight to fill a batch on every worker; the rest wait here
+    _admission = AdmissionController(
+        max_in_flight=max_batch_size * max(workers, 1),
+        max_queue=int(os.getenv("ML_MAX_QUEUE", MAX_QUEUE)),
+        batch_queue_share=float(os.getenv("ML_BATCH_QUEUE_SHARE", BATCH_QUEUE_SHARE)),
+    )
+    _result_cache = ResultCache(
+        max_entries=int(os.getenv("ML_RESULT_CACHE_SIZE", RESULT_CACHE_SIZE)),
+        redis_url=os.getenv("ML_CACHE_REDIS_URL", ""),
+        ttl=int(os.getenv("ML_RESULT_CACHE_TTL", RESULT_CACHE_TTL)),
+    )
+    await _result_cache.connect()
+    _summary_store = SummaryStore(redis_url=os.getenv("ML_CACHE_REDIS_URL", ""))
+    await _summary_store.connect()
     yield
     logger.info("MLService shutting down")
+    loader.cancel()
+    if _scheduler is not None:
+        await asyncio.to_thread(_scheduler.stop)
+    await _result_cache.close()
+    await _summary_store.close()
 
 
 app = FastAPI(
@@ -55,13 +239,14 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan,
 )
+app.add_middleware(RequestMetricsMiddleware, metrics=_metrics)
 
 
 # ── Request / Response schemas ────────────────────────────────────────────────
 
 
 class SummarizeRequest(BaseModel):
-    """List of notification texts to summarize."""
+    """List of notification texts to summarize, newest first."""
 
     notifications: list[str]
     max_tokens: int = MAX_TOKENS
@@ -69,6 +254,45 @@ class SummarizeRequest(BaseModel):
 
 class SummarizeResponse(BaseModel):
     summary: str
+    # "llm" or "extractive" (extractive.py)
+    engine: str = "llm"
+
+
+class BatchJob(BaseModel):
+    """One summary in a ``/summarize/batch`` request."""
+
+    id: str
+    notifications: list[str]
+    max_tokens: int = MAX_TOKENS
+
+
+class BatchRequest(BaseModel):
+    jobs: list[BatchJob]
+
+
+class IncrementalRequest(BaseModel):
+    """New notifications to fold into a rolling summary.
+
+    The previous summary comes from the store (``summary_id``) or is sent
+    inline (``previous_summary``). ``watermark`` marks the newest of
+    ``notifications`` and is stored with the result; ``base_watermark``,
+    if given, must match the stored one so concurrent updates don't
+    fold the same notifications twice.
+    """
+
+    notifications: list[str]
+    summary_id: str | None = None
+    previous_summary: str | None = None
+    watermark: str | None = None
+    base_watermark: str | None = None
+    max_tokens: int = MAX_TOKENS
+
+
+class IncrementalResponse(BaseModel):
+    summary: str
+    summary_id: str | None = None
+    watermark: str | None = None
+    notifications: int
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
@@ -78,45 +302,624 @@ def _build_prompt(notifications: list[str]) -> str:
     """Build a prompt that asks the model to summarize recent notifications."""
     joined = "\n---\n".join(notifications)
     return (
-        "<start_of_turn>user\n"
-        "Summarize the following list of notifications "
-        "into a brief overview in Russian. "
-        "Group by topic if possible. Be concise.\n\n"
-        f"{joined}<end_of_turn>\n"
-        "<start_of_turn>model\n"
+        PROMPT_PREFIX
+        + f"{joined}<end_of_turn>\n"
+        + "<start_of_turn>model\n"
+    )
+
+
+def _build_update_prompt(previous_summary: str, notifications: list[str]) -> str:
+    """Prompt that folds new notifications into an existing summary.
+
+    Starts with the same instruction block as ``_build_prompt`` so the
+    prefix KV cache is reused; its length doesn't grow with history.
+    """
+    joined = "\n---\n".join(notifications)
+    return (
+        PROMPT_PREFIX
+        + f"Current overview:\n{previous_summary}\n\n"
+        + f"New notifications to merge into it:\n{joined}<end_of_turn>\n"
+        + "<start_of_turn>model\n"
+    )
+
+
+def _build_reduce_prompt(partials: list[str]) -> str:
+    """Prompt that merges summaries of consecutive parts of a long list."""
+    joined = "\n---\n".join(partials)
+    return (
+        PROMPT_PREFIX
+        + "These are overviews of consecutive parts of a long list, newest first. "
+        + f"Merge them into one overview:\n{joined}<end_of_turn>\n"
+        + "<start_of_turn>model\n"
     )
 
 
+def _count_tokens(text: str) -> int:
+    return _backend.count_tokens(text)
+
+
+def _budget(max_tokens: int, template: str) -> int:
+    """Tokens left for the list after ``template`` (an empty prompt) and the output."""
+    return MAX_SEQ_LENGTH - max_tokens - _count_tokens(template)
+
+
+def _pack(notifications: list[str], max_tokens: int, reserved: str = "") -> list[str]:
+    """Fit notifications into the context left after the template and output.
+
+    ``reserved`` is extra prompt text (e.g. a previous summary) that also
+    has to fit.
+    """
+    budget = _budget(max_tokens, _build_update_prompt(reserved, []) if reserved else _build_prompt([]))
+    result = pack_notifications(notifications, _count_tokens, budget)
+
+    _packing["requests"] += 1
+    _packing["input_tokens"] += result.input_tokens
+    _packing["packed_tokens"] += result.packed_tokens
+    _packing["collapsed"] += result.collapsed
+    _packing["dropped"] += result.dropped
+    if result.saved_tokens:
+        logger.info(
+            f"Packed {len(notifications)} notifications into {len(result.notifications)} lines: "
+            f"{result.input_tokens} → {result.packed_tokens} tokens "
+            f"({result.collapsed} collapsed, {result.dropped} dropped)"
+        )
+    return result.notifications
+
+
+def _fallback_enabled() -> bool:
+    return os.getenv("ML_EXTRACTIVE_FALLBACK", str(EXTRACTIVE_FALLBACK)).lower() in ("1", "true", "yes")
+
+
+def _extractive_reason(notifications: list[str]) -> str | None:
+    """Why this request skips the model, if it does: small input or no model."""
+    if len(notifications) <= int(os.getenv("ML_EXTRACTIVE_MAX_NOTIFICATIONS", EXTRACTIVE_MAX_NOTIFICATIONS)):
+        return "small"
+    if (_scheduler is None or _backend is None) and _fallback_enabled():
+        return "unavailable"
+    return None
+
+
+def _extractive(notifications: list[str], reason: str) -> str:
+    _metrics.observe_extractive(reason)
+    return summarize_extractive(notifications)
+
+
+def _admission_params(request: Request, default: str = INTERACTIVE) -> tuple[str, float | None]:
+    """Priority class and deadline from the request headers.
+
+    ``X-Priority: interactive|batch`` (default ``default``) and
+    ``X-Request-Timeout: <seconds>`` – how long the client will wait.
+    """
+    priority = request.headers.get("x-priority", default).lower()
+    if priority not in PRIORITIES:
+        priority = default
+    deadline = None
+    timeout = request.headers.get("x-request-timeout")
+    if timeout:
+        try:
+            deadline = time.monotonic() + float(timeout)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="X-Request-Timeout must be a number of seconds")
+    return priority, deadline
+
+
+def _admission_error(error: Exception) -> HTTPException:
+    if isinstance(error, Overloaded):
+        return HTTPException(
+            status_code=429,
+            detail="MLService is overloaded",
+            headers={"Retry-After": str(error.retry_after)},
+        )
+    return HTTPException(status_code=504, detail="Request deadline exceeded")
+
+
+def _record_generation(prompt: str, output: str, seconds: float, ttft: float | None = None) -> None:
+    _metrics.observe_generation(_count_tokens(prompt), _count_tokens(output), seconds, ttft)
+
+
+async def _submit(prompt: str, max_tokens: int, priority: str, deadline: float | None) -> str:
+    """Generate once admitted; raises Overloaded / DeadlineExceeded otherwise."""
+    async with _admission.slot(priority, deadline):
+        started = time.perf_counter()
+        result = await _scheduler.submit(prompt, max_tokens)
+    _record_generation(prompt, result, time.perf_counter() - started)
+    return result
+
+
+async def _cached_with_retry(
+    key: str, compute: Callable[[], Awaitable[str]], attempts: int = 5,
+) -> str:
+    """Cached generation that waits out a full admission queue instead of failing."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return await _result_cache.get_or_compute(key, compute)
+        except Overloaded as e:
+            if attempt == attempts:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+def _hierarchical_enabled() -> bool:
+    return os.getenv("ML_HIERARCHICAL", str(HIERARCHICAL)).lower() in ("1", "true", "yes")
+
+
+async def _summarize_chunks(
+    chunks: list[list[str]],
+    build: Callable[[list[str]], str],
+    max_tokens: int,
+    priority: str,
+    deadline: float | None,
+    latencies: list[float],
+) -> list[str]:
+    """Summarize chunks concurrently, so the scheduler batches them together.
+
+    Chunk summaries are cached like any other; the latency of each is
+    appended to ``latencies``.
+    """
+    # Batch traffic waits for room in the queue, interactive fails fast
+    attempts = 5 if priority == BATCH else 1
+    model_id = _backend.identity if build is _build_prompt else f"{_backend.identity}:reduce"
+
+    async def one(chunk: list[str]) -> str:
+        started = time.perf_counter()
+        prompt = build(chunk)
+        summary = await _cached_with_retry(
+            cache_key(chunk, max_tokens, model_id),
+            lambda: _submit(prompt, max_tokens, priority, deadline),
+            attempts,
+        )
+        latencies.append(time.perf_counter() - started)
+        return summary.strip()
+
+    tasks = [asyncio.ensure_future(one(chunk)) for chunk in chunks]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        # One chunk failed (or the request was cancelled): drop the rest
+        for task in tasks:
+            task.cancel()
+
+
+async def _summary_prompt(
+    notifications: list[str], max_tokens: int, priority: str, deadline: float | None,
+) -> tuple[str, int]:
+    """Prompt for the final generation and the number of chunks behind it.
+
+    A list that doesn't fit one prompt even after collapsing repeats is
+    summarized hierarchically: prompt-sized chunks are summarized in
+    parallel (map), then the chunk summaries are merged (reduce), in as
+    many rounds as it takes for them to fit one prompt.
+    """
+    budget = _budget(max_tokens, _build_prompt([]))
+    total = sum(map(_count_tokens, notifications))
+    total += _count_tokens(SEPARATOR) * (len(notifications) - 1)
+    if total <= budget or not _hierarchical_enabled():
+        return _build_prompt(_pack(notifications, max_tokens)), 1
+
+    lines = pack_notifications(notifications, _count_tokens, math.inf).notifications
+    chunks = split_by_budget(lines, _count_tokens, budget)
+    if len(chunks) == 1:
+        return _build_prompt(lines), 1
+    max_chunks = int(os.getenv("ML_HIERARCHICAL_MAX_CHUNKS", HIERARCHICAL_MAX_CHUNKS))
+    if len(chunks) > max_chunks:
+        dropped = sum(map(len, chunks[max_chunks:]))
+        logger.warning(f"{len(chunks)} chunks, summarizing the newest {max_chunks} ({dropped} lines dropped)")
+        chunks = chunks[:max_chunks]
+
+    started = time.perf_counter()
+    latencies: list[float] = []
+    partials = await _summarize_chunks(chunks, _build_prompt, max_tokens, priority, deadline, latencies)
+    reduce_budget = _budget(max_tokens, _build_reduce_prompt([]))
+    while True:
+        groups = split_by_budget(partials, _count_tokens, reduce_budget)
+        if len(groups) == 1:
+            break
+        if len(groups) == len(partials):
+            # Summaries too long to merge pairwise: keep what fits
+            partials = pack_notifications(partials, _count_tokens, reduce_budget).notifications
+            break
+        partials = await _summarize_chunks(
+            groups, _build_reduce_prompt, max_tokens, priority, deadline, latencies,
+        )
+
+    _metrics.observe_hierarchical(latencies)
+    logger.info(
+        f"Hierarchical summary of {len(notifications)} notifications: {len(chunks)} chunks, "
+        f"{len(latencies)} chunk summaries in {time.perf_counter() - started:.1f} s "
+        f"(slowest {max(latencies):.1f} s)"
+    )
+    return _build_reduce_prompt(partials), len(chunks)
+
+
+async def _summarize(
+    notifications: list[str], max_tokens: int, priority: str, deadline: float | None,
+) -> str:
+    """Summary of a notification list, hierarchical when it is long."""
+    prompt, _ = await _summary_prompt(notifications, max_tokens, priority, deadline)
+    return await _submit(prompt, max_tokens, priority, deadline)
+
+
+async def _wait_or_disconnect(
+    request: Request, future: asyncio.Future, deadline: float | None = None,
+):
+    """Wait for ``future``; cancel it if the client disconnects or its deadline passes."""
+    while True:
+        done, _ = await asyncio.wait({future}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return future.result()
+        if deadline is not None and time.monotonic() >= deadline:
+            future.cancel()
+            logger.info("Request deadline passed, request dropped")
+            raise DeadlineExceeded()
+        if await request.is_disconnected():
+            future.cancel()
+            logger.info("Client disconnected, request dropped")
+            # 499: client closed request (nobody will read the response)
+            raise HTTPException(status_code=499, detail="Client disconnected")
+
+
 @app.post("/summarize", response_model=SummarizeResponse)
-async def summarize(request: SummarizeRequest):
+async def summarize(request: SummarizeRequest, http_request: Request):
     """Summarize a batch of notifications into a short digest."""
     if not request.notifications:
         raise HTTPException(status_code=400, detail="notifications list is empty")
 
-    if _model is None or _tokenizer is None:
-        raise HTTPException(status_code=503, detail="Model not loaded yet")
+    reason = _extractive_reason(request.notifications)
+    if reason is not None:
+        return SummarizeResponse(summary=_extractive(request.notifications, reason), engine="extractive")
 
-    from mlx_lm import generate
+    if _scheduler is None or _backend is None:
+        raise HTTPException(status_code=503, detail="Model not loaded yet")
 
-    prompt = _build_prompt(request.notifications)
+    priority, deadline = _admission_params(http_request)
+    key = cache_key(request.notifications, request.max_tokens, _backend.identity)
+    job = asyncio.ensure_future(_result_cache.get_or_compute(
+        key, lambda: _summarize(request.notifications, request.max_tokens, priority, deadline),
+    ))
 
     try:
-        result = generate(
-            _model,
-            _tokenizer,
-            prompt=prompt,
-            max_tokens=request.max_tokens,
-            verbose=False,
-        )
+        result = await _wait_or_disconnect(http_request, job, deadline)
         return SummarizeResponse(summary=result.strip())
+    except HTTPException:
+        raise
+    except (Overloaded, DeadlineExceeded) as e:
+        # A bot user gets a quick summary instead of "try later"
+        if isinstance(e, Overloaded) and priority == INTERACTIVE and _fallback_enabled():
+            return SummarizeResponse(
+                summary=_extractive(request.notifications, "overloaded"), engine="extractive",
+            )
+        raise _admission_error(e)
     except Exception as e:
         logger.error(f"Generation failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Summarization failed")
 
 
+@app.post("/summarize/batch")
+async def summarize_batch(request: BatchRequest, http_request: Request):
+    """Summarize many notification lists, streaming results as NDJSON.
+
+    Jobs are submitted shortest first, so similar lengths share
+    generation batches, with at most one admission window in flight.
+    Emits ``{"id": ..., "summary": ..., "engine": ...}`` or
+    ``{"id": ..., "error": ...}`` per job as it finishes, then
+    ``{"done": true, "succeeded": n, "failed": n, "total_ms": ...}``.
+    Batch priority unless ``X-Priority`` says otherwise.
+    """
+    if not request.jobs:
+        raise HTTPException(status_code=400, detail="jobs list is empty")
+
+    if (_scheduler is None or _backend is None) and not _fallback_enabled():
+        raise HTTPException(status_code=503, detail="Model not loaded yet")
+
+    priority, deadline = _admission_params(http_request, default=BATCH)
+    started = time.perf_counter()
+
+    # (input tokens, job, reason to skip the model)
+    prepared = []
+    for job in request.jobs:
+        reason = _extractive_reason(job.notifications) if job.notifications else None
+        if not job.notifications or reason is not None:
+            prepared.append((0, job, reason))
+            continue
+        prepared.append((sum(map(_count_tokens, job.notifications)), job, None))
+    prepared.sort(key=lambda item: item[0])
+
+    results: asyncio.Queue = asyncio.Queue()
+    window = asyncio.Semaphore(_admission.max_in_flight)
+
+    async def run(job: BatchJob, reason: str | None) -> None:
+        if not job.notifications:
+            await results.put({"id": job.id, "error": "notifications list is empty"})
+            return
+        if reason is not None:
+            summary = _extractive(job.notifications, reason)
+            await results.put({"id": job.id, "summary": summary, "engine": "extractive"})
+            return
+        key = cache_key(job.notifications, job.max_tokens, _backend.identity)
+        try:
+            async with window:
+                summary = await _cached_with_retry(
+                    key, lambda: _summarize(job.notifications, job.max_tokens, priority, deadline),
+                )
+            await results.put({"id": job.id, "summary": summary.strip(), "engine": "llm"})
+        except DeadlineExceeded:
+            await results.put({"id": job.id, "error": "deadline exceeded"})
+        except Exception as e:
+            logger.error(f"Batch job {job.id} failed: {e}", exc_info=True)
+            await results.put({"id": job.id, "error": "summarization failed"})
+
+    async def events():
+        tasks = [asyncio.create_task(run(*item[1:])) for item in prepared]
+        succeeded = failed = 0
+        try:
+            for _ in range(len(tasks)):
+                result = await results.get()
+                if "error" in result:
+                    failed += 1
+                else:
+                    succeeded += 1
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            # Client went away: stop whatever has not run yet
+            for task in tasks:
+                task.cancel()
+
+        total = time.perf_counter() - started
+        logger.info(
+            f"Batch of {len(tasks)} summaries in {total:.1f} s "
+            f"({succeeded} succeeded, {failed} failed)"
+        )
+        yield json.dumps({
+            "done": True,
+            "succeeded": succeeded,
+            "failed": failed,
+            "total_ms": round(total * 1000, 1),
+        }) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/summarize/incremental", response_model=IncrementalResponse)
+async def summarize_incremental(request: IncrementalRequest, http_request: Request):
+    """Update a rolling summary with only the notifications since its watermark."""
+    if not request.notifications:
+        raise HTTPException(status_code=400, detail="notifications list is empty")
+
+    if _scheduler is None or _backend is None:
+        raise HTTPException(status_code=503, detail="Model not loaded yet")
+
+    stored = await _summary_store.get(request.summary_id) if request.summary_id else None
+    if (
+        stored is not None
+        and request.base_watermark is not None
+        and stored.watermark != request.base_watermark
+    ):
+        raise HTTPException(
+            status_code=409,
+            detail=f"watermark mismatch: stored {stored.watermark!r}",
+        )
+
+    priority, deadline = _admission_params(http_request)
+    previous = request.previous_summary or (stored.summary if stored else None)
+    if previous:
+        packed = _pack(request.notifications, request.max_tokens, reserved=previous)
+        prompt = _build_update_prompt(previous, packed)
+    else:
+        prompt = _build_prompt(_pack(request.notifications, request.max_tokens))
+    job = asyncio.ensure_future(_submit(prompt, request.max_tokens, priority, deadline))
+
+    try:
+        result = (await _wait_or_disconnect(http_request, job, deadline)).strip()
+    except HTTPException:
+        raise
+    except (Overloaded, DeadlineExceeded) as e:
+        raise _admission_error(e)
+    except Exception as e:
+        logger.error(f"Incremental generation failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Summarization failed")
+
+    entry = RollingSummary(
+        summary=result,
+        watermark=request.watermark,
+        notifications=(stored.notifications if stored else 0) + len(request.notifications),
+    )
+    # Another update may have been stored while this one was generating
+    if request.summary_id and not await _summary_store.replace(request.summary_id, stored, entry):
+        raise HTTPException(
+            status_code=409,
+            detail="rolling summary was updated concurrently, re-read it and retry",
+        )
+    return IncrementalResponse(summary_id=request.summary_id, **vars(entry))
+
+
+@app.get("/summaries/{summary_id}", response_model=IncrementalResponse)
+async def get_rolling_summary(summary_id: str):
+    """Stored rolling summary and its watermark (what to send next time)."""
+    stored = await _summary_store.get(summary_id) if _summary_store else None
+    if stored is None:
+        raise HTTPException(status_code=404, detail="summary not found")
+    return IncrementalResponse(summary_id=summary_id, **vars(stored))
+
+
+def _whole_summary_stream(summary: str, started: float, engine: str, **extra) -> StreamingResponse:
+    """A ready summary in the /summarize/stream format: one token line, then done."""
+    elapsed = round((time.perf_counter() - started) * 1000, 1)
+    lines = [
+        json.dumps({"token": summary}, ensure_ascii=False) + "\n",
+        json.dumps({
+            "done": True,
+            "summary": summary.strip(),
+            "ttft_ms": elapsed,
+            "total_ms": elapsed,
+            "engine": engine,
+            **extra,
+        }, ensure_ascii=False) + "\n",
+    ]
+    return StreamingResponse(iter(lines), media_type="application/x-ndjson")
+
+
+@app.post("/summarize/stream")
+async def summarize_stream(request: SummarizeRequest, http_request: Request):
+    """Stream the summary as NDJSON while it is generated.
+
+    Emits ``{"token": ...}`` lines and a final
+    ``{"done": true, "summary": ..., "ttft_ms": ..., "total_ms": ..., "engine": ...}``;
+    on failure the last line is ``{"error": ...}``. When the client goes
+    away generation stops at the next token.
+    """
+    if not request.notifications:
+        raise HTTPException(status_code=400, detail="notifications list is empty")
+
+    started = time.perf_counter()
+    reason = _extractive_reason(request.notifications)
+    if reason is not None:
+        return _whole_summary_stream(_extractive(request.notifications, reason), started, "extractive")
+
+    if _scheduler is None or _backend is None:
+        raise HTTPException(status_code=503, detail="Model not loaded yet")
+
+    key = cache_key(request.notifications, request.max_tokens, _backend.identity)
+    cached = await _result_cache.get(key)
+    if cached is not None:
+        return _whole_summary_stream(cached, started, "llm", cached=True)
+
+    # Long lists: chunk summaries first, then stream the merged summary.
+    # Admit before the response starts, so overload is still a 429
+    priority, deadline = _admission_params(http_request)
+    try:
+        prompt, chunks = await _summary_prompt(
+            request.notifications, request.max_tokens, priority, deadline,
+        )
+        admitted_at = await _admission.acquire(priority, deadline)
+    except (Overloaded, DeadlineExceeded) as e:
+        if isinstance(e, Overloaded) and priority == INTERACTIVE and _fallback_enabled():
+            return _whole_summary_stream(
+                _extractive(request.notifications, "overloaded"), started, "extractive",
+            )
+        raise _admission_error(e)
+    except Exception as e:
+        logger.error(f"Chunk summaries failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Summarization failed")
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            _admission.release(admitted_at)
+
+    async def events():
+        ttft = None
+        pieces: list[str] = []
+        generation_started = time.perf_counter()
+        stream = _scheduler.submit_stream(prompt, request.max_tokens)
+        try:
+            async for piece in stream:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                pieces.append(piece)
+                yield json.dumps({"token": piece}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {e}", exc_info=True)
+            yield json.dumps({"error": "Summarization failed"}) + "\n"
+            return
+        finally:
+            await stream.aclose()
+            release()
+
+        total = time.perf_counter() - started
+        _record_generation(prompt, "".join(pieces), time.perf_counter() - generation_started, ttft)
+        await _result_cache.set(key, "".join(pieces), total)
+        logger.info(
+            f"Streamed summary: ttft {(ttft or total) * 1000:.0f} ms, total {total * 1000:.0f} ms"
+        )
+        yield json.dumps({
+            "done": True,
+            "summary": "".join(pieces).strip(),
+            "ttft_ms": round((ttft or total) * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+            "engine": "llm",
+            **({"chunks": chunks} if chunks > 1 else {}),
+        }, ensure_ascii=False) + "\n"
+
+    # The background task covers a response that never started streaming
+    return StreamingResponse(
+        events(), media_type="application/x-ndjson", background=BackgroundTask(release),
+    )
+
+
+def _gauges() -> dict[str, tuple[str, float | None]]:
+    """Point-in-time values for both metrics formats: name → (help, value)."""
+    prefix = (_backend.stats() if _backend else {}).get("prefix_cache")
+    prefix_lookups = prefix["hits"] + prefix["misses"] if prefix else 0
+    return {
+        "mlservice_ready": ("1 once the model is loaded and warmed up.", int(_scheduler is not None)),
+        "mlservice_load_seconds": ("Model load time at start-up.", _startup["load_s"]),
+        "mlservice_warmup_seconds": ("Warm-up generation time at start-up.", _startup["warmup_s"]),
+        "mlservice_queue_depth": (
+            "Requests in the scheduler.", _scheduler.depth if _scheduler else 0,
+        ),
+        "mlservice_admission_waiting": (
+            "Requests waiting for admission.", _admission.waiting if _admission else 0,
+        ),
+        "mlservice_peak_rss_bytes": ("Peak resident memory of the server process.", peak_rss_bytes()),
+        "mlservice_peak_device_memory_bytes": (
+            "Peak accelerator memory of the model.", _backend.peak_memory() if _backend else None,
+        ),
+        "mlservice_result_cache_hit_ratio": (
+            "Share of summaries served from the result cache.",
+            _result_cache.stats()["hit_rate"] if _result_cache else None,
+        ),
+        "mlservice_prefix_cache_hit_ratio": (
+            "Share of generations that reused the prefix KV cache.",
+            round(prefix["hits"] / prefix_lookups, 3) if prefix_lookups else None,
+        ),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Request, token, latency and memory metrics, cache hit rates, packing savings."""
+    return {
+        "backend": _backend.name if _backend else None,
+        "model_id": _backend.identity if _backend else None,
+        "inference": _metrics.snapshot(_gauges()),
+        "admission": _admission.stats() if _admission else None,
+        "result_cache": _result_cache.stats() if _result_cache else None,
+        **(_backend.stats() if _backend else {}),
+        **({"workers": _scheduler.stats()} if isinstance(_scheduler, WorkerPool) else {}),
+        "prompt_packing": {
+            **_packing,
+            "saved_tokens": _packing["input_tokens"] - _packing["packed_tokens"],
+        },
+    }
+
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def metrics_prometheus():
+    """The inference metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        _metrics.render_prometheus(_gauges()), media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the model is loaded and warmed up, 503 until then or if loading failed."""
+    return JSONResponse(
+        {"ready": _scheduler is not None, **_startup},
+        status_code=200 if _scheduler is not None else 503,
+    )
+
+
 @app.get("/health")
 async def health():
+    """Liveness: answers while the model is still loading."""
     return {
         "status": "ok",
-        "model_loaded": _model is not None,
+        "model_loaded": _scheduler is not None,
+        "startup": _startup,
+        "queue_depth": _scheduler.depth if _scheduler else 0,
+        **(_backend.stats() if _backend else {}),
+        **({"workers": _scheduler.stats()} if isinstance(_scheduler, WorkerPool) else {}),
     }
@@ -0,0 +1,126 @@
+"""
+Bookkeeping for speculative decoding.
+
+A small draft model proposes ``num_draft_tokens`` tokens per step and the
+main model verifies them; tokens the main model accepts come out marked
+``from_draft``. This module tracks the acceptance rate over a sliding
+window and decoding speed with and without the draft model. When
+acceptance drops below ``min_acceptance`` speculation is switched off for
+the next ``retry_after`` requests, because at low acceptance drafting is
+pure overhead.
+
+Only single and streaming requests go through the draft model, so the
+acceptance rate and speed-up describe those; prompts of multi-prompt
+batches are decoded without it and are only counted.
+"""
+
+import logging
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest request in the tokens/s moving averages
+_EWMA = 0.2
+
+
+class SpeculativeController:
+    """Decides per request whether to use the draft model."""
+
+    def __init__(
+        self,
+        num_draft_tokens: int,
+        min_acceptance: float,
+        window: int,
+        retry_after: int,
+        probe_every: int,
+    ):
+        self.num_draft_tokens = num_draft_tokens
+        self.min_acceptance = min_acceptance
+        # Draft tokens proposed before acceptance is judged
+        self.window = window
+        self.retry_after = retry_after
+        # Every N-th request runs without the draft to keep a baseline speed
+        self.probe_every = probe_every
+        self._recent: deque[tuple[int, int]] = deque()
+        self._accepted = 0
+        self._proposed = 0
+        self._paused = 0
+        self._requests = 0
+        self.fallbacks = 0
+        # Prompts decoded in multi-prompt batches, outside both speed samples
+        self.batched = 0
+        self.tokens_per_second: dict[str, Optional[float]] = {"speculative": None, "plain": None}
+
+    def use_draft(self) -> bool:
+        self._requests += 1
+        if self._paused > 0:
+            self._paused -= 1
+            return False
+        return self._requests % self.probe_every != 0
+
+    def record(self, speculative: bool, tokens: int, accepted: int, decode_seconds: float) -> None:
+        """Account for one finished generation.
+
+        ``decode_seconds`` runs from the first token to the last one.
+        """
+        if tokens > 1 and decode_seconds > 0:
+            mode = "speculative" if speculative else "plain"
+            tps = (tokens - 1) / decode_seconds
+            previous = self.tokens_per_second[mode]
+            if previous is not None:
+                tps = (1 - _EWMA) * previous + _EWMA * tps
+            self.tokens_per_second[mode] = tps
+        if not speculative:
+            return
+
+        # Every token the main model produced itself closes one draft round
+        proposed = (tokens - accepted) * self.num_draft_tokens
+        self._recent.append((accepted, proposed))
+        self._accepted += accepted
+        self._proposed += proposed
+        while self._recent and self._proposed - self._recent[0][1] >= self.window:
+            old_accepted, old_proposed = self._recent.popleft()
+            self._accepted -= old_accepted
+            self._proposed -= old_proposed
+
+        if self._proposed >= self.window and self.acceptance_rate < self.min_acceptance:
+            logger.warning(
+                f"Draft acceptance {self.acceptance_rate:.0%} below {self.min_acceptance:.0%}, "
+                f"speculative decoding paused for {self.retry_after} requests"
+            )
+            self.fallbacks += 1
+            self._paused = self.retry_after
+            self._recent.clear()
+            self._accepted = self._proposed = 0
+
+    def record_batch(self, size: int) -> None:
+        """Count prompts of a batched call, decoded without the draft model."""
+        self.batched += size
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self._accepted / self._proposed if self._proposed else 0.0
+
+    @property
+    def speed_up(self) -> Optional[float]:
+        speculative = self.tokens_per_second["speculative"]
+        plain = self.tokens_per_second["plain"]
+        if not speculative or not plain:
+            return None
+        return speculative / plain
+
+    def stats(self) -> dict:
+        speed_up = self.speed_up
+        return {
+            "active": self._paused == 0,
+            "num_draft_tokens": self.num_draft_tokens,
+            "acceptance_rate": round(self.acceptance_rate, 3),
+            "tokens_per_s": {
+                mode: round(tps, 1) if tps else None
+                for mode, tps in self.tokens_per_second.items()
+            },
+            "speed_up": round(speed_up, 2) if speed_up else None,
+            "fallbacks": self.fallbacks,
+            "batched_without_draft": self.batched,
+        }
@@ -0,0 +1,283 @@
+"""
+Inference metrics.
+
+Counts requests per endpoint and status, prompt and generated tokens,
+generation time, time-to-first-token and end-to-end latency (as
+histograms), and tracks peak memory. Every series carries the
+``backend`` and ``adapter`` labels so runs of different configurations
+can be told apart on one dashboard.
+
+:meth:`ServiceMetrics.snapshot` feeds the JSON ``/metrics`` endpoint,
+:meth:`ServiceMetrics.render_prometheus` the Prometheus text format on
+``/metrics/prometheus``.
+"""
+
+import bisect
+import resource
+import sys
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+# Window for the request and token rates in the JSON snapshot, seconds
+RATE_WINDOW = 60.0
+
+# Upper bounds of the histogram buckets, seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TTFT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds (Prometheus style)."""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bound plus +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip((*map(str, self.buckets), "+Inf"), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return float(bound) if bound != "+Inf" else self.buckets[-1]
+        return None
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 1) if self.count else None,
+            "p50_le_ms": _ms(self.quantile(0.5)),
+            "p95_le_ms": _ms(self.quantile(0.95)),
+            "p99_le_ms": _ms(self.quantile(0.99)),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ServiceMetrics:
+    """Counters and histograms for one MLService process."""
+
+    def __init__(self):
+        self.labels = {"backend": "", "adapter": "none"}
+        self.started_at = time.time()
+        self.requests: dict[tuple[str, int], int] = {}
+        self.latency: dict[str, Histogram] = {}
+        self.ttft = Histogram(TTFT_BUCKETS)
+        self.generations = 0
+        self.prompt_tokens = 0
+        self.generated_tokens = 0
+        self.generation_seconds = 0.0
+        # Extractive summaries by reason (small input, overloaded, unavailable)
+        self.extractive: dict[str, int] = {}
+        # Hierarchical summaries and the latency of their chunk summaries
+        self.hierarchical = 0
+        self.chunk_latency = Histogram(LATENCY_BUCKETS)
+        # Arrival times of recent requests, (time, tokens) of recent generations
+        self._recent_requests: deque[float] = deque()
+        self._recent_tokens: deque[tuple[float, int]] = deque()
+
+    def set_labels(self, backend: str, adapter: Optional[str]) -> None:
+        self.labels = {"backend": backend, "adapter": adapter or "none"}
+
+    # ── Recording ─────────────────────────────────────────────────────────────
+
+    def observe_request(self, endpoint: str, status: int, seconds: float) -> None:
+        """One finished HTTP request, from receipt to the last body byte."""
+        key = (endpoint, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        if status < 400:
+            self.latency.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(seconds)
+        now = time.monotonic()
+        self._recent_requests.append(now)
+        self._trim(now)
+
+    def observe_generation(
+        self, prompt_tokens: int, generated_tokens: int, seconds: float, ttft: Optional[float] = None,
+    ) -> None:
+        """One model generation (result cache hits are not generations).
+
+        ``ttft`` is only known for streamed generations.
+        """
+        self.generations += 1
+        self.prompt_tokens += prompt_tokens
+        self.generated_tokens += generated_tokens
+        self.generation_seconds += seconds
+        if ttft is not None:
+            self.ttft.observe(ttft)
+        now = time.monotonic()
+        self._recent_tokens.append((now, generated_tokens))
+        self._trim(now)
+
+    def observe_extractive(self, reason: str) -> None:
+        self.extractive[reason] = self.extractive.get(reason, 0) + 1
+
+    def observe_hierarchical(self, chunk_seconds: list[float]) -> None:
+        self.hierarchical += 1
+        for seconds in chunk_seconds:
+            self.chunk_latency.observe(seconds)
+
+    def _trim(self, now: float) -> None:
+        while self._recent_requests and now - self._recent_requests[0] > RATE_WINDOW:
+            self._recent_requests.popleft()
+        while self._recent_tokens and now - self._recent_tokens[0][0] > RATE_WINDOW:
+            self._recent_tokens.popleft()
+
+    # ── Export ────────────────────────────────────────────────────────────────
+
+    def snapshot(self, gauges: dict[str, tuple[str, Optional[float]]]) -> dict:
+        """JSON view.
+
+        ``gauges`` are point-in-time values owned by the caller, mapping
+        metric names to ``(help, value)``.
+        """
+        self._trim(time.monotonic())
+        window = min(RATE_WINDOW, max(time.time() - self.started_at, 1e-9))
+        return {
+            "labels": dict(self.labels),
+            "requests": {
+                f"{endpoint} {status}": count
+                for (endpoint, status), count in sorted(self.requests.items())
+            },
+            "requests_per_s": round(len(self._recent_requests) / window, 3),
+            "tokens": {
+                "prompt": self.prompt_tokens,
+                "generated": self.generated_tokens,
+                # Per second of generation time, and over the last RATE_WINDOW
+                "tokens_per_s": (
+                    round(self.generated_tokens / self.generation_seconds, 1)
+                    if self.generation_seconds else None
+                ),
+                "throughput_per_s": round(sum(n for _, n in self._recent_tokens) / window, 1),
+            },
+            "latency": {endpoint: hist.summary() for endpoint, hist in sorted(self.latency.items())},
+            "ttft": self.ttft.summary(),
+            "extractive": dict(self.extractive),
+            "hierarchical": {
+                "summaries": self.hierarchical,
+                "chunk_latency": self.chunk_latency.summary(),
+            },
+            **{name.removeprefix("mlservice_"): value for name, (_, value) in gauges.items()},
+        }
+
+    def render_prometheus(self, gauges: dict[str, tuple[str, Optional[float]]]) -> str:
+        """Prometheus text exposition format; gauges without a value are skipped."""
+        lines: list[str] = []
+        base = self.labels
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def sample(name: str, value: float, **extra: str) -> None:
+            lines.append(f"{name}{{{_labels({**base, **extra})}}} {_number(value)}")
+
+        family("mlservice_requests_total", "counter", "Summarize requests by endpoint and status.")
+        for (endpoint, status), count in sorted(self.requests.items()):
+            sample("mlservice_requests_total", count, endpoint=endpoint, status=str(status))
+
+        for name, help_text, value in (
+            ("mlservice_generations_total", "Model generations (cache hits excluded).", self.generations),
+            ("mlservice_prompt_tokens_total", "Prompt tokens sent to the model.", self.prompt_tokens),
+            ("mlservice_generated_tokens_total", "Tokens generated by the model.", self.generated_tokens),
+            ("mlservice_generation_seconds_total", "Time spent generating.", self.generation_seconds),
+            ("mlservice_hierarchical_summaries_total", "Summaries made from chunk summaries.", self.hierarchical),
+        ):
+            family(name, "counter", help_text)
+            sample(name, value)
+
+        family("mlservice_extractive_summaries_total", "counter", "Summaries made without the model, by reason.")
+        for reason, count in sorted(self.extractive.items()):
+            sample("mlservice_extractive_summaries_total", count, reason=reason)
+
+        family("mlservice_request_latency_seconds", "histogram", "End-to-end latency of successful requests.")
+        for endpoint, hist in sorted(self.latency.items()):
+            _histogram(hist, "mlservice_request_latency_seconds", sample, endpoint=endpoint)
+
+        family("mlservice_ttft_seconds", "histogram", "Time to the first streamed token.")
+        _histogram(self.ttft, "mlservice_ttft_seconds", sample)
+
+        family("mlservice_chunk_latency_seconds", "histogram", "Latency of chunk summaries in hierarchical mode.")
+        _histogram(self.chunk_latency, "mlservice_chunk_latency_seconds", sample)
+
+        for name, (help_text, value) in gauges.items():
+            if value is None:
+                continue
+            family(name, "gauge", help_text)
+            sample(name, value)
+        return "\n".join(lines) + "\n"
+
+
+def _histogram(hist: Histogram, name: str, sample: Callable, **labels: str) -> None:
+    for bound, total in hist.cumulative():
+        sample(f"{name}_bucket", total, le=bound, **labels)
+    sample(f"{name}_sum", hist.sum, **labels)
+    sample(f"{name}_count", hist.count, **labels)
+
+
+def _labels(labels: dict[str, str]) -> str:
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels.items()
+    )
+    return ",".join(f'{key}="{value}"' for key, value in escaped)
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing POST requests until the last body byte is sent.
+
+    Streaming responses are timed to the end of the stream, not to the
+    response headers.
+    """
+
+    def __init__(self, app, metrics: ServiceMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.observe_request(scope["path"], status, time.perf_counter() - started)
@@ -0,0 +1,10 @@
+"""Shared setup for MLService tests: flat modules on the path, fake backend."""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# No model weights in tests: deterministic text from backends.FakeBackend
+os.environ.setdefault("ML_BACKEND", "fake")
@@ -0,0 +1,52 @@
+"""Rolling summary updates through /summarize/incremental."""
+
+import asyncio
+from contextlib import AsyncExitStack
+
+import httpx
+import pytest
+
+import server
+
+
+async def _ready_client(stack) -> httpx.AsyncClient:
+    await stack.enter_async_context(server.lifespan(server.app))
+    client = await stack.enter_async_context(httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=server.app), base_url="http://test", timeout=30,
+    ))
+    for _ in range(200):
+        if (await client.get("/ready")).status_code == 200:
+            return client
+        await asyncio.sleep(0.05)
+    pytest.fail("model did not become ready")
+
+
+def test_overlapping_updates_do_not_overwrite_each_other(monkeypatch):
+    # Slow enough that both updates read the same stored summary
+    monkeypatch.setenv("ML_FAKE_TOKEN_MS", "20")
+
+    async def main():
+        async with AsyncExitStack() as stack:
+            client = await _ready_client(stack)
+            first = await client.post("/summarize/incremental", json={
+                "summary_id": "user:1", "notifications": ["[github/issue] a: one"], "watermark": "1",
+            })
+            assert first.status_code == 200
+
+            updates = await asyncio.gather(*(
+                client.post("/summarize/incremental", json={
+                    "summary_id": "user:1",
+                    "notifications": [f"[github/issue] {name}: two", f"[github/issue] {name}: three"],
+                    "watermark": "3",
+                    "base_watermark": "1",
+                })
+                for name in ("b", "c")
+            ))
+            stored = (await client.get("/summaries/user:1")).json()
+            return sorted(r.status_code for r in updates), stored
+
+    statuses, stored = asyncio.run(main())
+    assert statuses == [200, 409]
+    # The rejected update did not fold its notifications in
+    assert stored["notifications"] == 3
+    assert stored["watermark"] == "3"
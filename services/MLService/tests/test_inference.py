@@ -0,0 +1,60 @@
+"""InferenceScheduler batching."""
+
+import asyncio
+import time
+
+from inference import InferenceScheduler
+
+
+def test_batched_jobs_keep_their_own_max_tokens():
+    calls = []
+
+    def generate_batch(prompts: list[str], max_tokens: list[int]) -> list[str]:
+        calls.append((prompts, max_tokens))
+        return [f"{prompt}:{limit}" for prompt, limit in zip(prompts, max_tokens)]
+
+    async def main():
+        scheduler = InferenceScheduler(generate_batch, max_batch_size=4, max_wait_ms=200)
+        scheduler.start()
+        try:
+            return await asyncio.gather(scheduler.submit("a", 64), scheduler.submit("b", 512))
+        finally:
+            await asyncio.to_thread(scheduler.stop)
+
+    assert asyncio.run(main()) == ["a:64", "b:512"]
+    # One batch, each prompt with its own limit
+    assert calls == [(["a", "b"], [64, 512])]
+
+
+def test_stream_does_not_hold_up_batches():
+    events = []
+
+    def generate_batch(prompts: list[str], max_tokens: list[int]) -> list[str]:
+        events.append("batch")
+        return prompts
+
+    def stream_generate(prompt: str, max_tokens: int):
+        for i in range(max_tokens):
+            time.sleep(0.002)
+            events.append("piece")
+            yield f"{i} "
+
+    async def main():
+        scheduler = InferenceScheduler(
+            generate_batch, max_batch_size=4, max_wait_ms=1, stream_generate=stream_generate,
+        )
+        scheduler.start()
+        try:
+            pieces = scheduler.submit_stream("long", 200)
+            first = await anext(pieces)
+            result = await scheduler.submit("short", 8)
+            rest = [piece async for piece in pieces]
+            return first, result, rest
+        finally:
+            await asyncio.to_thread(scheduler.stop)
+
+    first, result, rest = asyncio.run(main())
+    assert result == "short"
+    assert len(rest) == 199
+    # The batch ran long before the stream finished
+    assert events.index("batch") < 100
@@ -0,0 +1,361 @@
+"""
+Multi-process model serving.
+
+Runs N worker processes, each with its own backend instance and the usual
+dynamic batching scheduler (inference.py), behind the FastAPI front end.
+Requests go to the worker with the fewest requests in flight.
+
+Weights are shared between the replicas when the backend memory-maps
+them: llama.cpp maps the GGUF file read-only, so N workers use one copy
+of the weights in the page cache. MLX copies weights into each process,
+so multi-worker mode is meant for the CPU backend on many-core hosts.
+
+The pool has the same ``start``/``stop``/``submit``/``submit_stream``/
+``depth`` interface as :class:`inference.InferenceScheduler`.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import AsyncIterator, Optional
+
+from config import MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS
+
+logger = logging.getLogger(__name__)
+
+# Worker startup includes loading the model
+READY_TIMEOUT = 600
+
+
+# ── Worker process ────────────────────────────────────────────────────────────
+
+
+def _worker_main(
+    conn,
+    backend_name: str,
+    model_name: str,
+    adapter_path: Optional[str],
+    prompt_prefix: Optional[str],
+    max_batch_size: int,
+    max_wait_ms: float,
+) -> None:
+    """Entry point of a worker process: load the model, then serve the pipe."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] worker %(process)d: %(message)s",
+    )
+    from backends import get_backend
+    from inference import InferenceScheduler
+
+    started = time.perf_counter()
+    backend = get_backend(backend_name)
+    backend.load(model_name, adapter_path=adapter_path)
+    if prompt_prefix:
+        backend.set_prompt_prefix(prompt_prefix)
+    conn.send(("ready", time.perf_counter() - started))
+
+    scheduler = InferenceScheduler(
+        backend.batch_generate, max_batch_size, max_wait_ms,
+        stream_generate=backend.stream, interleave_streams=backend.interleaved_streams,
+    )
+    asyncio.run(_serve(conn, scheduler))
+
+
+async def _serve(conn, scheduler) -> None:
+    loop = asyncio.get_running_loop()
+    scheduler.start()
+    tasks: dict[int, asyncio.Task] = {}
+
+    async def generate(job_id: int, prompt: str, max_tokens: int) -> None:
+        try:
+            conn.send(("done", job_id, await scheduler.submit(prompt, max_tokens)))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            conn.send(("error", job_id, str(e)))
+        finally:
+            tasks.pop(job_id, None)
+
+    async def stream(job_id: int, prompt: str, max_tokens: int) -> None:
+        pieces = scheduler.submit_stream(prompt, max_tokens)
+        try:
+            async for piece in pieces:
+                conn.send(("token", job_id, piece))
+            conn.send(("done", job_id, None))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            conn.send(("error", job_id, str(e)))
+        finally:
+            await pieces.aclose()
+            tasks.pop(job_id, None)
+
+    handlers = {"generate": generate, "stream": stream}
+    while True:
+        try:
+            message = await loop.run_in_executor(None, conn.recv)
+        except EOFError:
+            break
+        kind = message[0]
+        if kind == "stop":
+            break
+        if kind == "cancel":
+            task = tasks.get(message[1])
+            if task:
+                task.cancel()
+            continue
+        job_id = message[1]
+        tasks[job_id] = asyncio.create_task(handlers[kind](*message[1:]))
+
+    for task in list(tasks.values()):
+        task.cancel()
+    await asyncio.to_thread(scheduler.stop)
+
+
+# ── Front end ─────────────────────────────────────────────────────────────────
+
+
+class _Worker:
+    def __init__(self, index: int, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.alive = True
+        self.in_flight = 0
+        self.completed = 0
+        self.load_seconds = 0.0
+        # Time with at least one request in flight
+        self.busy_seconds = 0.0
+        self._busy_since: Optional[float] = None
+
+    def acquire(self) -> None:
+        if self.in_flight == 0:
+            self._busy_since = time.perf_counter()
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight == 0 and self._busy_since is not None:
+            self.busy_seconds += time.perf_counter() - self._busy_since
+            self._busy_since = None
+
+    def busy(self) -> float:
+        current = time.perf_counter() - self._busy_since if self._busy_since else 0.0
+        return self.busy_seconds + current
+
+
+class WorkerPool:
+    """N model worker processes with least-loaded routing."""
+
+    def __init__(
+        self,
+        workers: int,
+        backend_name: str,
+        model_name: str,
+        adapter_path: Optional[str] = None,
+        prompt_prefix: Optional[str] = None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_BATCH_WAIT_MS,
+    ):
+        self.size = workers
+        self._args = (backend_name, model_name, adapter_path, prompt_prefix, max_batch_size, max_wait_ms)
+        self._workers: list[_Worker] = []
+        self._pending: dict[int, tuple[_Worker, object]] = {}
+        self._ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started_at = 0.0
+        self._stopping = False
+
+    @property
+    def depth(self) -> int:
+        return sum(worker.in_flight for worker in self._workers)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Spawn the workers and wait until every one has loaded the model.
+
+        Without ``loop`` it must be called from the event loop thread.
+        """
+        self._loop = loop or asyncio.get_running_loop()
+        ctx = multiprocessing.get_context("spawn")
+        # Split CPU threads between replicas unless configured explicitly
+        os.environ.setdefault("ML_CPU_THREADS", str(max(1, (os.cpu_count() or 1) // self.size)))
+
+        try:
+            for index in range(self.size):
+                parent_conn, child_conn = ctx.Pipe()
+                process = ctx.Process(
+                    target=_worker_main,
+                    args=(child_conn, *self._args),
+                    name=f"model-worker-{index}",
+                    daemon=True,
+                )
+                process.start()
+                child_conn.close()
+                self._workers.append(_Worker(index, process, parent_conn))
+
+            for worker in self._workers:
+                if not worker.conn.poll(READY_TIMEOUT):
+                    raise RuntimeError(f"model worker {worker.index} did not start in {READY_TIMEOUT}s")
+                # EOFError if the worker died while loading
+                _, worker.load_seconds = worker.conn.recv()
+        except BaseException:
+            # Don't leave the workers that did load holding a model copy
+            self._terminate()
+            raise
+
+        for worker in self._workers:
+            threading.Thread(
+                target=self._read, args=(worker,), name=f"model-worker-{worker.index}-reader", daemon=True,
+            ).start()
+        self._started_at = time.perf_counter()
+        logger.info(
+            f"Started {self.size} model workers "
+            f"(load {max(w.load_seconds for w in self._workers):.1f} s)"
+        )
+
+    def stop(self) -> None:
+        self._stopping = True
+        for worker in self._workers:
+            if worker.alive:
+                try:
+                    worker.conn.send(("stop",))
+                except OSError:
+                    pass
+        for worker in self._workers:
+            worker.process.join(timeout=30)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._workers = []
+
+    def _terminate(self) -> None:
+        """Kill the workers right away, loaded or not (failed start)."""
+        for worker in self._workers:
+            worker.process.terminate()
+        for worker in self._workers:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+        self._workers = []
+
+    # ── Requests ──────────────────────────────────────────────────────────────
+
+    def _pick(self) -> _Worker:
+        alive = [worker for worker in self._workers if worker.alive]
+        if not alive:
+            raise RuntimeError("no model workers available")
+        return min(alive, key=lambda worker: worker.in_flight)
+
+    async def submit(self, prompt: str, max_tokens: int) -> str:
+        """Run one prompt on the least-loaded worker and wait for the result."""
+        worker = self._pick()
+        job_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[job_id] = (worker, future)
+        worker.acquire()
+        try:
+            worker.conn.send(("generate", job_id, prompt, max_tokens))
+            return await future
+        except asyncio.CancelledError:
+            self._cancel(worker, job_id)
+            raise
+        finally:
+            self._pending.pop(job_id, None)
+            worker.release()
+
+    async def submit_stream(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """Stream one prompt from the least-loaded worker."""
+        worker = self._pick()
+        job_id = next(self._ids)
+        pieces: asyncio.Queue = asyncio.Queue()
+        self._pending[job_id] = (worker, pieces)
+        worker.acquire()
+        finished = False
+        try:
+            worker.conn.send(("stream", job_id, prompt, max_tokens))
+            while True:
+                item = await pieces.get()
+                if item is None:
+                    finished = True
+                    return
+                if isinstance(item, BaseException):
+                    finished = True
+                    raise item
+                yield item
+        finally:
+            if not finished:
+                self._cancel(worker, job_id)
+            self._pending.pop(job_id, None)
+            worker.release()
+
+    def _cancel(self, worker: _Worker, job_id: int) -> None:
+        if worker.alive:
+            try:
+                worker.conn.send(("cancel", job_id))
+            except OSError:
+                pass
+
+    # ── Responses ─────────────────────────────────────────────────────────────
+
+    def _read(self, worker: _Worker) -> None:
+        """Reader thread: hand worker messages over to the event loop."""
+        while True:
+            try:
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                self._loop.call_soon_threadsafe(self._on_exit, worker)
+                return
+            self._loop.call_soon_threadsafe(self._on_message, message)
+
+    def _on_message(self, message: tuple) -> None:
+        kind, job_id, payload = message
+        pending = self._pending.get(job_id)
+        if pending is None:
+            return
+        worker, target = pending
+        if isinstance(target, asyncio.Queue):
+            if kind == "token":
+                target.put_nowait(payload)
+                return
+            target.put_nowait(None if kind == "done" else RuntimeError(payload))
+        elif not target.done():
+            if kind == "done":
+                target.set_result(payload)
+            else:
+                target.set_exception(RuntimeError(payload))
+        worker.completed += 1
+
+    def _on_exit(self, worker: _Worker) -> None:
+        if not worker.alive:
+            return
+        worker.alive = False
+        if not self._stopping:
+            logger.error(f"Model worker {worker.index} exited (code {worker.process.exitcode})")
+        error = RuntimeError(f"model worker {worker.index} exited")
+        for owner, target in list(self._pending.values()):
+            if owner is not worker:
+                continue
+            if isinstance(target, asyncio.Queue):
+                target.put_nowait(error)
+            elif not target.done():
+                target.set_exception(error)
+
+    def stats(self) -> list[dict]:
+        uptime = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return [
+            {
+                "worker": worker.index,
+                "pid": worker.process.pid,
+                "alive": worker.alive,
+                "in_flight": worker.in_flight,
+                "completed": worker.completed,
+                "load_s": round(worker.load_seconds, 2),
+                "utilisation": round(worker.busy() / uptime, 3) if uptime else 0.0,
+            }
+            for worker in self._workers
+        ]